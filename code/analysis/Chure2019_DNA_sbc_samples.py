@@ -3,32 +3,21 @@ import numpy as np
 import pandas as pd
 import mut.thermo
 import mut.bayes
-import mut.stats
-import tqdm
 constants = mut.thermo.load_constants()
 
-# Load the prior predictive check data. 
-prior_data = pd.read_csv('../../data/Chure2019_DNA_prior_predictive_checks.csv')
+# Guard the script so worker processes can import it under the spawn
+# start method.
+if __name__ == '__main__':
+    # Load the prior predictive check data. 
+    prior_data = pd.read_csv('../../data/Chure2019_DNA_prior_predictive_checks.csv')
+    n_sims = prior_data['sim_idx'].nunique()
 
-# Load the stan model. 
-model = mut.bayes.StanModel('../stan/Chure2019_DNA_binding_energy.stan')
+    # Definie the thinning constant for computing the rank statistic. 
+    thin = 5
 
-# Set up a dataframe to store the properties.
-samples_dfs = []
-sbc_dfs = []
-
-# Definie the thinning constant for computing the rank statistic. 
-thin = 5
-
-# Iterate through each simulation
-for g, d in tqdm.tqdm(prior_data.groupby('sim_idx')):
-    
-    # Determine the ground truth for each parameter.
-    gt = {'ep_RA': d['ep_RA'].unique(),
-         'sigma': d['sigma'].unique()}
-
-    # Generate the data dictionary. 
-    data_dict = {'J':1,
+    # Generate the data dictionary of each simulation.
+    def build_data_dict(g, d):
+        return {'J':1,
                 'N': len(d),
                 'idx': np.ones(len(d)).astype(int),
                 'R': np.ones(len(d)) * constants['RBS1027'],
@@ -39,34 +28,11 @@ for g, d in tqdm.tqdm(prior_data.groupby('sim_idx')):
                 'Ki': constants['Ki'],
                 'c': d['IPTGuM'],
                 'fc': d['fc_draw']}
-    
-    # Sample the model
-    _, samples = model.sample(data_dict=data_dict) 
-    samples.rename(columns={'ep_RA[1]': 'ep_RA', 'sigma[1]':'sigma'},
-                  inplace=True)
-    samples['sim_idx'] = g
-    samples_dfs.append(samples)
-    
-    # Compute the properties for each parameter. 
-    _sbc_dfs = []
-    for p in ['ep_RA', 'sigma']:
-        _df = pd.DataFrame([])
-        z_score = (np.mean(samples[p]) - gt[p]) / np.std(samples[p])
-        shrinkage = 1 - (np.var(samples[p]) / np.var(prior_data[p].unique()))
-        _df['z_score'] = z_score
-        _df['shrinkage'] = shrinkage
-        _df['param'] = p 
-        _df['rank'] = np.sum(samples[p].values[::thin] < gt[p])
-        _df['rank_ndraws'] = len(samples[p].values[::thin])
-        _df['post_median'] = np.median(samples[p])
-        _df['post_mean'] = np.mean(samples[p])
-        _df['post_mode'] = samples.iloc[np.argmax(samples['lp__'].values)][p]
-        _df['ground_truth'] = gt[p]
-        _sbc_dfs.append(_df)
-        
-    _sbc_dfs = pd.concat(_sbc_dfs)
-    _sbc_dfs['sim_idx'] = g
-    sbc_dfs.append(_sbc_dfs) 
-sbc_df = pd.concat(sbc_dfs) 
-    
-sbc_df.to_csv('../../data/Chure2019_DNA_sbc_statistics.csv', index=False)
+
+    # Fit each simulation in parallel and compute the calibration statistics.
+    sbc_df = mut.bayes.run_sbc('../stan/Chure2019_DNA_binding_energy.stan',
+                               lambda n: prior_data, build_data_dict, n_sims,
+                               thin=thin, params=['ep_RA', 'sigma'],
+                               rename={'ep_RA[1]': 'ep_RA', 'sigma[1]':'sigma'},
+                               run_dir='../../data/DNA_sbc_run')
+    sbc_df.to_csv('../../data/Chure2019_DNA_sbc_statistics.csv', index=False)
@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 import mut.thermo
 import mut.bayes
+import mut.stats
 import tqdm
 constants = mut.thermo.load_constants()
 
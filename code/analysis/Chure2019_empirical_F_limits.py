@@ -3,12 +3,9 @@ import numpy as np
 import pandas as pd
 import mut.thermo
 import mut.bayes
-import tqdm
+import mut.stats
 constants = mut.thermo.load_constants()
 
-# Load the statistical model. 
-model = mut.bayes.StanModel('../stan/Chure2019_empirical_F_inference.stan')
-
 # Define the parameters
 n_rep = 10
 n_points = 500
@@ -19,45 +16,39 @@ fc_mu = (1 + np.exp(-F_mu))**-1
 
 # Draw sigmas out of a half normal 
 sig = np.abs(np.random.normal(0, 0.1, len(F_mu)))
-dfs = []
-for i in range(n_points):
-    fc_rand = np.random.normal(fc_mu[i], sig[i], n_rep)
-    df = pd.DataFrame([])
-    df['fold_change'] = fc_rand
-    df['fc_mu'] = fc_mu[i]
-    df['fc_sig'] = sig[i]
-    df['bohr']  = F_mu[i]
-    df['draw'] = i
-    dfs.append(df)
-df = pd.concat(dfs)
-
-samp_dfs = []
-stat_dfs = []
-for g, d in tqdm.tqdm(df.groupby(['draw'])):
-    # Sample the posterior for the data
-    _, samples = model.sample(dict(N=len(d), foldchange=d['fold_change']), 
-                            control=dict(adapt_delta=0.95))
-    samples['true_mu'] = d['fc_mu'].values[0]
-    samples['true_sig'] = d['fc_sig'].values[0]
-    samples['true_bohr'] = d['bohr'].values[0]
-    samp_dfs.append(samples)
-
-    # Compute the empirical bohr and delta F 
-    samples['empirical_bohr'] = -np.log(samples['fc_mu']**-1 - 1)
-    samples['delta_bohr'] = d['bohr'].values[0] - samples['empirical_bohr'] 
-
-    # Compute the delta F error of the reference, given the sigma
-    _dbohr_stats = mut.stats.compute_statistics(samples, varnames=['delta_bohr', 
-                                                'empirical_bohr', 'fc_mu', 
-                                                'fc_sigma'], 
-                                                logprob_name='lp__')   
-    _dbohr_stats['true_mu'] = d['fc_mu'].values[0] 
-    _dbohr_stats['true_sig'] = d['fc_sig'].values[0]
-    _dbohr_stats['true_bohr'] = d['bohr'].values[0]
-    stat_dfs.append(_dbohr_stats)
-
-samples = pd.concat(samp_dfs)
-stats = pd.concat(stat_dfs)
+fc_rand = np.random.normal(fc_mu[:, np.newaxis], sig[:, np.newaxis],
+                           (n_points, n_rep))
+df = pd.DataFrame({'fold_change': fc_rand.ravel(),
+                   'fc_mu': np.repeat(fc_mu, n_rep),
+                   'fc_sig': np.repeat(sig, n_rep),
+                   'bohr': np.repeat(F_mu, n_rep),
+                   'draw': np.repeat(np.arange(n_points), n_rep)})
+
+# Infer the empirical bohr and delta F of all draws at once. 
+stats = mut.bayes.empirical_F_statistics(df, 'draw', ref_name='bohr')
+truth = df.groupby('draw')[['fc_mu', 'fc_sig', 'bohr']].first()
+truth.columns = ['true_mu', 'true_sig', 'true_bohr']
+stats['order'] = stats['parameter'].map({'delta_bohr': 0, 
+                        'empirical_bohr': 1, 'fc_mu': 2, 'fc_sigma': 3})
+stats = stats.merge(truth, left_on='draw', right_index=True).sort_values(
+                    ['draw', 'order']).drop(columns=['draw', 'order'])
+
+# Report delta F as true - empirical bohr, as in the Stan based statistics.
+delF = stats['parameter'] == 'delta_bohr'
+stats.loc[delF, ['mean', 'median', 'mode', 'hpd_min', 'hpd_max']] = \
+    -stats.loc[delF, ['mean', 'median', 'mode', 'hpd_max', 'hpd_min']].values
+
+# Compute the bias and credible region width over the noise regimes.
+F_grid = np.linspace(-12, 12, n_points)
+sigma_grid = np.linspace(0.005, 0.3, 30)
+bias, width = mut.stats.empirical_F_limits(F_grid, sigma_grid, n_rep,
+                                           n_sims=3, chunk_size=5000)
+limits = pd.DataFrame({'true_bohr': np.repeat(F_grid, len(sigma_grid)),
+                       'true_sig': np.tile(sigma_grid, len(F_grid)),
+                       'bias': bias.ravel(), 'hpd_width': width.ravel()})
+
+# The posterior samples of each draw are not saved. Nothing reads them and
+# they are redrawn in a fraction of a second by mut.bayes.sample_empirical_F.
 df.to_csv('../../data/Chure2019_empirical_F_simulated_data.csv', index=False)
-samples.to_csv('../../data/Chure2019_empirical_F_simulated_data_samples.csv', index=False)
-stats.to_csv('../../data/Chure2019_empirical_F_simulated_data_statistics.csv', index=False)
\ No newline at end of file
+stats.to_csv('../../data/Chure2019_empirical_F_simulated_data_statistics.csv', index=False)
+limits.to_csv('../../data/Chure2019_empirical_F_limits.csv', index=False)
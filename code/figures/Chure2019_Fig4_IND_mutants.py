@@ -4,6 +4,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import mut.thermo
 import mut.viz
+import mut.stats
 import seaborn as sns
 constants = mut.thermo.load_constants()
 colors = mut.viz.color_selector('pboc')
@@ -95,11 +96,7 @@ for i, o in enumerate(('O1', 'O2', 'O3')):
 
         # Plot the credible regions for the kaki and epAI fits.
        _kaki = kaki_epAI_samps[kaki_epAI_samps['mutant']==m]
-       cred_region = np.zeros((2, len(c_range)))
-       for j, c in enumerate(c_range):
-            arch = mut.thermo.SimpleRepression(R=260, ep_r=ep_r, ka=_kaki['Ka'], 
-                    ki=_kaki['Ki'],  ep_ai=_kaki['ep_AI'], effector_conc=c).fold_change()
-            cred_region[:, j] = mut.stats.compute_hpd(arch, 0.95)
+       cred_region, _ = mut.stats.credible_band(_kaki, c_range, R=260, ep_r=ep_r)
     
        ax[0, a].fill_between(c_range, cred_region[0, :], cred_region[1, :], 
                               color=op_colors[o], alpha=0.4)
@@ -117,12 +114,12 @@ ref_pact  = mut.thermo.MWC(effector_conc=c_range, ka=constants['Ka'],
                            ki=constants['Ki'], ep_ai=constants['ep_AI']).pact()
 for g, d in data.groupby(['mutant']):
     _kaki_samps = kaki_epAI_samps[kaki_epAI_samps['mutant']==g]
-    cred_region = np.zeros((2, len(c_range)))
-    for i, c in enumerate(c_range):
-        pact = mut.thermo.MWC(effector_conc=c, ka=_kaki_samps['Ka'],
-                              ki=_kaki_samps['Ki'], ep_ai=_kaki_samps['ep_AI']).pact()
-        delF = -np.log(pact / ref_pact[i])
-        cred_region[:, i] = mut.stats.compute_hpd(delF, 0.95)
+    pact = mut.thermo.MWC(effector_conc=c_range[np.newaxis, :],
+                          ka=_kaki_samps['Ka'].values[:, np.newaxis],
+                          ki=_kaki_samps['Ki'].values[:, np.newaxis],
+                          ep_ai=_kaki_samps['ep_AI'].values[:, np.newaxis]).pact()
+    delF = -np.log(pact / ref_pact[np.newaxis, :])
+    cred_region = mut.stats.compute_hpd(delF, 0.95)
     
     # Plot!
     ax[-1, axes[g]].fill_between(c_range, cred_region[0, :], cred_region[1, :],
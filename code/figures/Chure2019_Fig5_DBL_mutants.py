@@ -149,14 +149,12 @@ for dna, dna_idx in DNA_idx.items():
         epRA_draws = np.random.choice(_epRA_samps['ep_RA'].values, replace=True,
                                       size=n_draws)
         allo_draws = _allo_samps.sample(n=n_draws, replace=True)
-        fc_cred_region = np.zeros((2, len(c_range)))
-        bohr_cred_region = np.zeros((2, len(c_range)))
-        for i, c in enumerate(c_range):
-            arch = mut.thermo.SimpleRepression(R=260, ep_r=epRA_draws,
-                            ka=allo_draws['Ka'], ki=allo_draws['Ki'], 
-                            ep_ai=allo_draws['ep_AI'], n_sites=2, effector_conc=c)
-            fc_cred_region[:, i] = mut.stats.compute_hpd(arch.fold_change(), 0.95)
-            bohr_cred_region[:, i] = mut.stats.compute_hpd(arch.bohr_parameter() - ref_bohr[i], 0.95)
+        fc_cred_region, _ = mut.stats.credible_band(allo_draws, c_range, R=260,
+                                                    ep_r=epRA_draws, n_sites=2)
+        bohr_cred_region, _ = mut.stats.credible_band(allo_draws, c_range,
+                                quantity='bohr_parameter', R=260,
+                                ep_r=epRA_draws, n_sites=2)
+        bohr_cred_region -= ref_bohr
 
         ax[dna_idx, ind_idx].fill_between(c_range, fc_cred_region[0, :], 
                                         fc_cred_region[1, :], alpha=0.3, 
@@ -2,6 +2,7 @@
 import pandas as pd
 import numpy as np
 import mut.thermo
+import mut.stats
 import matplotlib.pyplot as plt
 import mut.viz
 import mut.thermo
@@ -20,6 +21,8 @@ epRA_stats = pd.read_csv('../../data/Chure2019_DNA_binding_energy_summary.csv')
 epRA_stats = epRA_stats[epRA_stats['repressors']==260]
 allo_stats = pd.read_csv('../../data/Chure2019_KaKi_epAI_summary.csv')
 allo_stats = allo_stats[allo_stats['operator']=='O2']
+epRA_index = mut.stats.SummaryIndex(epRA_stats, keys=['mutant', 'parameter'])
+allo_index = mut.stats.SummaryIndex(allo_stats, keys=['mutant', 'parameter'])
 
 # Load the data from the old gods
 old_gods = pd.read_csv('../../data/Garcia2011_Brewster2014.csv', comment='#')
@@ -92,8 +95,7 @@ for g, d in data[data['class']=='DNA'].groupby(['mutant']):
         _g = 'Q18M'
     elif g == 'Y20I':
         _g = 'Y17I'
-    ep_RA = epRA_stats[(epRA_stats['mutant']==g) &
-                (epRA_stats['parameter']=='ep_RA')]['median'].values[0]
+    ep_RA = epRA_index.get(mutant=g, parameter='ep_RA')
     bohr = mut.thermo.SimpleRepression(R=d['repressors'], ep_r=ep_RA, 
                                            ka=constants['Ka'], ki=constants['Ki'],
                                            ep_ai=constants['ep_AI'],
@@ -114,10 +116,8 @@ for g, d in data[data['class']=='IND'].groupby(['mutant']):
         _g = 'Q291V'
     elif g == 'F164T':
         _g = 'F161T'
-    _stats = allo_stats[(allo_stats['mutant']==g)]
-    ka = _stats[_stats['parameter']=='Ka']['median'].values[0]
-    ki = _stats[_stats['parameter']=='Ki']['median'].values[0]
-    ep_AI = _stats[_stats['parameter']=='ep_AI']['median'].values[0]
+    ka, ki, ep_AI = allo_index.lookup(mutant=g,
+                                      parameter=['Ka', 'Ki', 'ep_AI'])
     ops = [constants[o] for o in d['operator'].values]
     bohr = mut.thermo.SimpleRepression(R=d['repressors'], ep_r=ops, 
                                            ka=ka, ki=ki,
@@ -141,12 +141,9 @@ for g, d in data[data['class']=='DBL'].groupby(['mutant']):
     pos = int(_ind[1:-1])-3
     new_ind = orig + str(pos) + end
     mut_name = f'{new_dna}-{new_ind}'
-    ep_RA = epRA_stats[(epRA_stats['mutant']==g.split('-')[0]) & 
-                           (epRA_stats['parameter']=='ep_RA')]['median'].values[0]
-    _stats = allo_stats[(allo_stats['mutant']==g.split('-')[1])]
-    ka = _stats[_stats['parameter']=='Ka']['median'].values[0]
-    ki = _stats[_stats['parameter']=='Ki']['median'].values[0]
-    ep_AI = _stats[_stats['parameter']=='ep_AI']['median'].values[0]
+    ep_RA = epRA_index.get(mutant=g.split('-')[0], parameter='ep_RA')
+    ka, ki, ep_AI = allo_index.lookup(mutant=g.split('-')[1],
+                                      parameter=['Ka', 'Ki', 'ep_AI'])
     bohr = mut.thermo.SimpleRepression(R=d['repressors'], ep_r=ep_RA, 
                                            ka=ka, ki=ki,
                                            ep_ai=ep_AI,
@@ -89,18 +89,12 @@ for g, d in data.groupby(['mutant']):
                 else:
                     _samps = KaKi_epAI_samples[(KaKi_epAI_samples['mutant']==m) &\
                         (KaKi_epAI_samples['operator']==ops[i])]
-                Ka = _samps['Ka']
-                Ki = _samps['Ki']
-                epAI = _samps['ep_AI']
-                cred_region = np.zeros((2, len(c_range)))
-                for z, c in enumerate(c_range): 
-                    # Compute the fold-change   
-                    fc = mut.thermo.SimpleRepression(R=constants['RBS1027'], 
-                                            ep_r=constants[ops[j]], ka=Ka, 
-                                                 ki=Ki, ep_ai=epAI,
-                                                effector_conc=c, n_sites=constants['n_sites'],
-                                                n_ns=constants['Nns']).fold_change()
-                    cred_region[:, z] = mut.stats.compute_hpd(fc, 0.95)
+                # Compute the fold-change   
+                cred_region, _ = mut.stats.credible_band(_samps, c_range,
+                                        R=constants['RBS1027'],
+                                        ep_r=constants[ops[j]],
+                                        n_sites=constants['n_sites'],
+                                        n_ns=constants['Nns'])
                 
                 # Plot the fit. 
                 # _ = ax[i, j].plot(c_range / 1E6, fc[:, 0], color=color[m], lw=0.75) 
@@ -97,15 +97,16 @@ for g, d in data.groupby(['mutant', 'operator', 'IPTGuM']):
 ref = mut.thermo.MWC(ka=constants['Ka'], ki=constants['Ki'], ep_ai=constants['ep_AI'],
                     effector_conc=c_range).pact()
 for g, d in data.groupby(['mutant', 'operator']):
-    cred_region = np.zeros((2, len(c_range)))
     _samps = KaKi_epAI_samples[(KaKi_epAI_samples['mutant']==g[0]) & 
                                 (KaKi_epAI_samples['operator']==g[1])]
 
-    for i, c in enumerate(c_range):
-        pact = mut.thermo.MWC(ka=_samps['Ka'], ki=_samps['Ki'], ep_ai=_samps['ep_AI'],
-                            effector_conc=c).pact()
-        dbohr = -np.log(pact / ref[i])
-        cred_region[:, i] = mut.stats.compute_hpd(dbohr, 0.95)
+    # Evaluate all draws at all concentrations and compute the band at once.
+    pact = mut.thermo.MWC(ka=_samps['Ka'].values[:, np.newaxis],
+                          ki=_samps['Ki'].values[:, np.newaxis],
+                          ep_ai=_samps['ep_AI'].values[:, np.newaxis],
+                          effector_conc=c_range[np.newaxis, :]).pact()
+    dbohr = -np.log(pact / ref[np.newaxis, :])
+    cred_region = mut.stats.compute_hpd(dbohr, 0.95)
     _ax=ax[ops[g[1]], muts[g[0]]]
     _ax.fill_between(c_range, cred_region[0, :], cred_region[1, :], 
                     color=op_colors[g[1]], alpha=0.5)
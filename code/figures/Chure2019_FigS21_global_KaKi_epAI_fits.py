@@ -63,12 +63,8 @@ for m, a in axes.items():
 for g, d in samples.groupby(['mutant']):
     for o, c in op_colors.items():
         _ax = ax[0, axes[g]]
-        cred_region = np.zeros((2, len(c_range)))
-        for i, _c in enumerate(c_range):
-            arch = mut.thermo.SimpleRepression(R=constants['RBS1027'], 
-                    ep_r=constants[o], ka=d['Ka'], ki=d['Ki'], ep_ai=d['ep_AI'],
-                    effector_conc=_c).fold_change()
-            cred_region[:, i] = mut.stats.compute_hpd(arch, 0.95)
+        cred_region, _ = mut.stats.credible_band(d, c_range, 
+                                R=constants['RBS1027'], ep_r=constants[o])
         _ax.fill_between(c_range, cred_region[0, :], cred_region[1, :], color=c, 
             alpha=0.5) 
 
@@ -79,12 +75,12 @@ wt_pact = mut.thermo.MWC(ka=constants['Ka'], ki=constants['Ki'], effector_conc=c
                         ep_ai=constants['ep_AI']).pact()
 for g, d in samples.groupby(['mutant']):
     _ax = ax[1, axes[g]]
-    cred_region = np.zeros((2, len(c_range)))
-    for i, _c in enumerate(c_range):
-        arch = mut.thermo.MWC(ka=d['Ka'], ki=d['Ki'], ep_ai=d['ep_AI'],
-                    effector_conc=_c).pact()
-        dBohr = -np.log(arch / wt_pact[i])
-        cred_region[:, i] = mut.stats.compute_hpd(dBohr, 0.95)
+    pact = mut.thermo.MWC(ka=d['Ka'].values[:, np.newaxis],
+                          ki=d['Ki'].values[:, np.newaxis],
+                          ep_ai=d['ep_AI'].values[:, np.newaxis],
+                          effector_conc=c_range[np.newaxis, :]).pact()
+    dbohr = -np.log(pact / wt_pact[np.newaxis, :])
+    cred_region = mut.stats.compute_hpd(dbohr, 0.95)
     _ax.fill_between(c_range, cred_region[0, :], cred_region[1, :], color='slategray', 
             alpha=0.5) 
 
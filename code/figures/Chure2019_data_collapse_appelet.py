@@ -6,6 +6,7 @@ import bokeh.io
 from bokeh.themes import Theme
 import mut.viz
 import mut.thermo
+import mut.stats
 bokeh.plotting.output_file("../../figures/data_collapse.html")
 
 constants = mut.thermo.load_constants()
@@ -41,6 +42,8 @@ epRA_stats = pd.read_csv('../../data/Chure2019_DNA_binding_energy_summary.csv')
 epRA_stats = epRA_stats[epRA_stats['repressors']==260]
 allo_stats = pd.read_csv('../../data/Chure2019_KaKi_epAI_summary.csv')
 allo_stats = allo_stats[allo_stats['operator']=='O2']
+epRA_index = mut.stats.SummaryIndex(epRA_stats, keys=['mutant', 'parameter'])
+allo_index = mut.stats.SummaryIndex(allo_stats, keys=['mutant', 'parameter'])
 
 # Define colors and glyphs
 _color = {'garcia': pboc_colors['red'], 'brewster':pboc_colors['blue']}
@@ -113,8 +116,7 @@ for g, d in old_gods.groupby('author'):
 op_glyphs = {'O1':'^', 'O2':'v', 'O3':'D'}
 for g, d in data[data['class']=='DNA'].groupby(['mutant']):
     d = d.copy()
-    ep_RA = epRA_stats[(epRA_stats['mutant']==g) &
-                (epRA_stats['parameter']=='ep_RA')]['median'].values[0]
+    ep_RA = epRA_index.get(mutant=g, parameter='ep_RA')
     bohr = mut.thermo.SimpleRepression(R=d['repressors'], ep_r=ep_RA, 
                                            ka=constants['Ka'], ki=constants['Ki'],
                                            ep_ai=constants['ep_AI'],
@@ -130,10 +132,8 @@ for g, d in data[data['class']=='DNA'].groupby(['mutant']):
 # ##############################################################################
 for g, d in data[data['class']=='IND'].groupby(['mutant']):
     d = d.copy()
-    _stats = allo_stats[(allo_stats['mutant']==g)]
-    ka = _stats[_stats['parameter']=='Ka']['median'].values[0]
-    ki = _stats[_stats['parameter']=='Ki']['median'].values[0]
-    ep_AI = _stats[_stats['parameter']=='ep_AI']['median'].values[0]
+    ka, ki, ep_AI = allo_index.lookup(mutant=g,
+                                      parameter=['Ka', 'Ki', 'ep_AI'])
     ops = [constants[o] for o in d['operator'].values]
     bohr = mut.thermo.SimpleRepression(R=d['repressors'], ep_r=ops, 
                                            ka=ka, ki=ki,
@@ -151,12 +151,9 @@ for g, d in data[data['class']=='IND'].groupby(['mutant']):
 # ##############################################################################
 for g, d in data[data['class']=='DBL'].groupby(['mutant']):
     d = d.copy()
-    ep_RA = epRA_stats[(epRA_stats['mutant']==g.split('-')[0]) & 
-                           (epRA_stats['parameter']=='ep_RA')]['median'].values[0]
-    _stats = allo_stats[(allo_stats['mutant']==g.split('-')[1])]
-    ka = _stats[_stats['parameter']=='Ka']['median'].values[0]
-    ki = _stats[_stats['parameter']=='Ki']['median'].values[0]
-    ep_AI = _stats[_stats['parameter']=='ep_AI']['median'].values[0]
+    ep_RA = epRA_index.get(mutant=g.split('-')[0], parameter='ep_RA')
+    ka, ki, ep_AI = allo_index.lookup(mutant=g.split('-')[1],
+                                      parameter=['Ka', 'Ki', 'ep_AI'])
     bohr = mut.thermo.SimpleRepression(R=d['repressors'], ep_r=ep_RA, 
                                            ka=ka, ki=ki,
                                            ep_ai=ep_AI,
@@ -7,54 +7,43 @@ at the front of the script to run on any data set.
 import numpy as np
 import pandas as pd
 import glob
-import imp
 import mut.flow
 
-# Define the experiment parameters
-DATE = 20190410 # Date of the experiment
-RUN_NO = 2 # Integer identifier of the run number for the day
-USERNAME = 'gchure' # Identifier of who took the data
-gating_fraction = 0.4 # Sets the percentile of the flow data to keep.
-
-# Load all files. 
-files = glob.glob('../data/flow/{0}*_r{1}*.csv'.format(DATE, RUN_NO))
-
-# Set up the DataFrame
-colnames = ['date', 'username', 'mutant', 'operator', 'strain', 'IPTGuM',
-            'mean_FITC_H']
-df = pd.DataFrame([], columns=colnames)
-
-for f in files:
-    # Get the identifying finformation.
-    date, _, operator, strain, mutant, conc = f.split('/')[-1].split('_')
-    conc = float(conc.split('uM')[0])
-    rep = int(strain.split('R')[-1])
-
-    # Load in the data
-    data = pd.read_csv(f)
-    gated = mut.flow.gaussian_gate(data, gating_fraction)
-
-    # Compute the mean
-    mean_FITC = gated['FITC-H'].mean()
-
-    # Assemble the dictionary
-    samp_dict = dict(date=date, username=USERNAME, mutant=mutant,
-                     operator=operator, strain=strain, IPTGuM=conc,
-                     mean_FITC_H=mean_FITC, repressors=rep)
-    df = df.append(samp_dict, ignore_index=True)
-
-
-fc_dfs = []
-grouped = df[df['mutant']!='auto'].groupby(['IPTGuM', 'operator'])
-mean_auto_df = df[df['mutant'] == 'auto']
-for g, d in grouped:
-    mean_auto = mean_auto_df[mean_auto_df['IPTGuM']==g[0]]['mean_FITC_H'].values[0]
-    mean_delta = d.loc[d['mutant'] == 'delta']['mean_FITC_H'].values[0]
-    d['fold_change'] = (d['mean_FITC_H'] - mean_auto) /  (mean_delta - mean_auto)
-    fc_dfs.append(d)
-
-fold_change_df = pd.concat(fc_dfs, axis=0)
-
-# Save to a CSV.
-fold_change_df.to_csv(
-    './output/{0}_r{1}_fold_change.csv'.format(DATE, RUN_NO))
\ No newline at end of file
+# Guard the script so worker processes can import it under the spawn
+# start method.
+if __name__ == '__main__':
+    # Define the experiment parameters
+    DATE = 20190410 # Date of the experiment
+    RUN_NO = 2 # Integer identifier of the run number for the day
+    USERNAME = 'gchure' # Identifier of who took the data
+    gating_fraction = 0.4 # Sets the percentile of the flow data to keep.
+    CACHE_DIR = '../data/flow/gate_cache' # Stores gates to skip unchanged files.
+
+    # Load all files. The FCS files are read directly without conversion to csv.
+    files = glob.glob('../data/flow/{0}*_r{1}*.fcs'.format(DATE, RUN_NO))
+
+    # Gate all files in parallel, keeping only the summary statistics.
+    summary = mut.flow.gate_plate(files, gating_fraction, workers=None,
+                                  cache_dir=CACHE_DIR)
+
+    # Get the identifying information from the file names.
+    info = summary['file'].str.split('/').str[-1].str.split('_', expand=True)
+    summary['date'] = info[0]
+    summary['username'] = USERNAME
+    summary['operator'] = info[2]
+    summary['strain'] = info[3]
+    summary['mutant'] = info[4]
+    summary['IPTGuM'] = info[5].str.split('uM').str[0].astype(float)
+    summary['repressors'] = info[3].str.split('R').str[-1].astype(int)
+
+    # Join the autofluorescence and delta references and compute the
+    # fold-change. To fold newly gated wells into an existing table, pass the
+    # full returned table, which includes the reference wells, as `previous`.
+    fold_change_df = mut.flow.compute_fold_change(summary)
+
+    # Save to a CSV with the samples and columns of the original output.
+    colnames = ['date', 'username', 'mutant', 'operator', 'strain', 'IPTGuM',
+                'mean_FITC_H', 'repressors', 'fold_change']
+    fold_change_df = fold_change_df[fold_change_df['mutant'] != 'auto']
+    fold_change_df[colnames].to_csv(
+        './output/{0}_r{1}_fold_change.csv'.format(DATE, RUN_NO))
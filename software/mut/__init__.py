@@ -2,12 +2,24 @@
 
 """Top level package for MWC utilities"""
 
-# from . import mcmc
-from . import viz
-from . import flow
-from . import stats
-from . import thermo
+import importlib
+
+# Submodules are imported on first access so that, for example, using
+# `mut.thermo` does not import the plotting or Stan dependencies. Lazy
+# access requires Python 3.7 (PEP 562); scripts should import every
+# submodule they use, e.g. `import mut.stats`, to run on Python 3.6.
+__all__ = ['bayes', 'flow', 'io', 'stats', 'thermo', 'viz']
 
 __author__ = """Griffin Chure"""
 __email__ = """gchure@caltech.edu"""
 __version__ = '0.0.9'
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
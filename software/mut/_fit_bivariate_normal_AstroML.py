@@ -11,7 +11,6 @@ License:
     licensing and are the copyright of the owners.
 """
 import numpy as np
-from scipy import stats
 
 #from scipy.special import erfinv
 #sigmaG_factor = 1. / (2 * np.sqrt(2) * erfinv(0.5))
@@ -251,6 +250,7 @@ def fit_bivariate_normal(x, y, robust=False):
         mu_y = np.mean(y)
         sigma_y = np.std(y)
 
+        from scipy import stats
         r_xy = stats.pearsonr(x, y)[0]
 
     # We need to use the full (-180, 180) version of arctan: this is
@@ -266,3 +266,148 @@ def fit_bivariate_normal(x, y, robust=False):
                               sigma_xy ** 2)))
 
     return [mu_x, mu_y], sigma1, sigma2, alpha
+
+
+# ------------------------------------------------------------------------------
+# Streaming estimation
+# ------------------------------------------------------------------------------
+# The functions below are not part of astroML. They estimate the same robust
+# bivariate normal parameters from a single pass over chunks of points using a
+# bounded-memory uniform reservoir sample as the quantile sketch.
+
+def reservoir_sample(chunks, sketch_size=100000, seed=None):
+    """
+    Draw a uniform random sample of fixed size from a stream of paired points
+
+    Parameters
+    ----------
+    chunks : iterable
+        Iterable yielding (x, y) tuples of equal-length 1D arrays.
+    sketch_size : int (optional, default=100000)
+        Maximum number of points held in memory.
+    seed : int (optional)
+        Seed of the random number generator for reproducible sketches.
+
+    Returns
+    -------
+    x, y : ndarray
+        The sampled points. If fewer than `sketch_size` points are provided,
+        all points are returned in their original order.
+    n : int
+        The total number of points in the stream.
+
+    Notes
+    -----
+    This is Algorithm R of Vitter (1985) vectorized over chunks. The
+    empirical distribution of the sample deviates from that of the stream
+    by at most sqrt(log(2 / delta) / (2 * sketch_size)) in rank with
+    probability 1 - delta (Dvoretzky-Kiefer-Wolfowitz inequality), so the
+    quartiles of the sample are quantile sketches of the full stream.
+    """
+    rng = np.random.RandomState(seed)
+    res_x = np.empty(sketch_size)
+    res_y = np.empty(sketch_size)
+    n = 0
+    for x, y in chunks:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if x.shape != y.shape:
+            raise ValueError('x and y chunks must have the same shape.')
+        m = len(x)
+
+        # Fill the reservoir until it is full.
+        n_fill = max(min(sketch_size - n, m), 0)
+        res_x[n:n + n_fill] = x[:n_fill]
+        res_y[n:n + n_fill] = y[:n_fill]
+
+        # Replace reservoir members with probability sketch_size / (t + 1).
+        t = np.arange(n + n_fill, n + m)
+        slots = (rng.random_sample(len(t)) * (t + 1)).astype(np.int64)
+        keep = np.where(slots < sketch_size)[0]
+        if len(keep) > 0:
+            # Only the last point assigned to a slot survives the chunk.
+            _slots = slots[keep][::-1]
+            _, last = np.unique(_slots, return_index=True)
+            inds = keep[::-1][last] + n_fill
+            res_x[_slots[last]] = x[inds]
+            res_y[_slots[last]] = y[inds]
+        n += m
+    n_res = min(n, sketch_size)
+    return res_x[:n_res], res_y[:n_res], n
+
+
+def fit_bivariate_normal_streaming(chunks, sketch_size=100000, seed=None):
+    """
+    Fit robust bivariate normal parameters to a stream of 2D points in a
+    single pass with bounded memory
+
+    Parameters
+    ----------
+    chunks : iterable
+        Iterable yielding (x, y) tuples of equal-length 1D arrays.
+    sketch_size : int (optional, default=100000)
+        Maximum number of points held in memory. See `reservoir_sample`.
+    seed : int (optional)
+        Seed of the random number generator for reproducible fits.
+
+    Returns
+    -------
+    mu : tuple
+        (x, y) location of the best-fit bivariate normal
+    sigma_1, sigma_2 : float
+        The best-fit gaussian widths in the uncorrelated frame
+    alpha : float
+        The rotation angle in radians of the uncorrelated frame
+
+    See Also
+    --------
+    fit_bivariate_normal : exact, in-memory version of this calculation.
+    bivariate_fit_drift : deviation of this estimate from the exact fit.
+    """
+    x, y, _ = reservoir_sample(chunks, sketch_size=sketch_size, seed=seed)
+    return fit_bivariate_normal(x, y, robust=True)
+
+
+def bivariate_fit_drift(x, y, chunk_size=100000, sketch_size=100000,
+                        seed=None, delta=0.05):
+    """
+    Report how far the streaming robust fit drifts from the exact fit
+
+    Parameters
+    ----------
+    x, y : array_like
+        The x, y coordinates of the points
+    chunk_size : int (optional, default=100000)
+        Number of points per chunk of the simulated stream.
+    sketch_size : int (optional, default=100000)
+        Maximum number of points held in memory by the streaming fit.
+    seed : int (optional)
+        Seed of the random number generator of the streaming fit.
+    delta : float (optional, default=0.05)
+        Failure probability of the reported rank error bound.
+
+    Returns
+    -------
+    drift : dict
+        Absolute differences between the streaming and exact estimates of
+        `mu_x`, `mu_y`, `sigma_1`, `sigma_2`, and `alpha`, as well as the
+        `rank_error` bound of the sketch quartiles, which holds with
+        probability 1 - delta and is zero when the sketch holds every point.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    chunks = ((x[i:i + chunk_size], y[i:i + chunk_size])
+              for i in range(0, len(x), chunk_size))
+    exact = fit_bivariate_normal(x, y, robust=True)
+    approx = fit_bivariate_normal_streaming(chunks, sketch_size=sketch_size,
+                                            seed=seed)
+    if len(x) <= sketch_size:
+        rank_error = 0.0
+    else:
+        rank_error = np.sqrt(np.log(2 / delta) / (2 * sketch_size))
+    return {'mu_x': np.abs(approx[0][0] - exact[0][0]),
+            'mu_y': np.abs(approx[0][1] - exact[0][1]),
+            'sigma_1': np.abs(approx[1] - exact[1]),
+            'sigma_2': np.abs(approx[2] - exact[2]),
+            'alpha': np.abs(approx[3] - exact[3]),
+            'rank_error': rank_error}
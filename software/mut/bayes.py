@@ -1,18 +1,30 @@
 # -*- coding: utf-8 -*-
 import os
+import re
+import sys
+import hashlib
+import contextlib
+import subprocess
+import sysconfig
+import concurrent.futures
 import numpy as np
 import pandas as pd
 import pickle
-import pystan
-import tqdm
-from .stats import compute_statistics
+from .stats import compute_statistics, _sorted_hpd, _sorted_median
+from .io import _atomic_to_feather
+from . import thermo
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 class StanModel(object):
     R"""
     Custom StanModel class for crafting and sampling from Stan
     models.
     """
-    def __init__(self, file, data_dict=None, samples=None, force_compile=False):
+    def __init__(self, file, data_dict=None, samples=None, force_compile=False,
+                 cache_dir=None):
         """
         Parameters
         ----------
@@ -25,13 +37,18 @@ class StanModel(object):
         force_compile: bool
             If True, model will be forced to compile. If False, 
             a precompiled file will be loaded if present. 
+        cache_dir: str
+            Directory of compiled models. See `loadStanModel`.
         """
+        self.file = file
+        self.cache_dir = cache_dir
         if '.pkl' in file:
             s = _load(file)
             self.model = s[0]
             self.samples = s[1]
         else:
-            self.model = loadStanModel(file, force=force_compile)
+            self.model = loadStanModel(file, force=force_compile,
+                                       cache_dir=cache_dir)
             self.data = data_dict
             self.samples = samples
             self.df = None
@@ -146,22 +163,763 @@ class StanModel(object):
         return df 
 
                 
-def loadStanModel(fname, force=False):
-    """Loads a precompiled Stan model. If no compiled model is found, one will be saved."""
-    # Identify the model name and directory structure
-    rel, sm_dir = fname.split('/stan/')
-    sm_name = sm_dir.split('.stan')[0]
-    pkl_name = f'{rel}/stan/{sm_name}.pkl' 
+def sample_groups(model, df, groupby, build_data_dict, workers=None,
+                  varnames=None, logprob_name='lp__', rename={},
+                  return_samples=False, transform=None, cache_dir=None,
+                  run_dir=None, **sampler_kwargs):
+    """
+    Samples a Stan model independently for each group of a DataFrame across
+    a pool of worker processes, yielding the summary of each group as soon
+    as it finishes.
+
+    If a `run_dir` is provided, the samples of each group are saved to it as
+    soon as the group finishes. Entries are keyed by the group, a hash of
+    its data dictionary, a hash of the model (see `loadStanModel`), and the
+    sampling settings. Groups with a saved entry are loaded rather than
+    sampled, so an interrupted run can be resumed and adding new groups only
+    samples the new groups. The saved samples are those of the sampler, and
+    `transform` and the summary are applied after loading, so they always
+    reflect the current `transform`.
+
+    Only the sampled quantities and the log posterior `lp__` are kept, not
+    the sampler diagnostics. Without a `transform`, each group is
+    summarized in its worker process. With a `transform`, the samples are
+    sent back and transformed and summarized in the calling process, which
+    serializes the summaries but lets the transform read the state of the
+    calling process.
+
+    Parameters
+    ----------
+    model: str or StanModel
+        Path to the Stan model file or a `StanModel` built from one. The
+        compiled model is loaded on the first group of each worker process
+        through `loadStanModel`.
+    df: pandas DataFrame
+        The data to be grouped.
+    groupby: str or list of str
+        Column(s) by which to group `df`.
+    build_data_dict: callable
+        Function with signature `build_data_dict(g, d)` returning the data
+        dictionary of the model for the group key `g` and group DataFrame
+        `d`. It is called in the calling process.
+    workers: int
+        Number of worker processes. If None, the number of processors on the
+        machine is used. If 1, groups are sampled in the calling process.
+    varnames: list of str
+        Parameters to summarize after renaming. If None, all parameters,
+        transformed parameters, and generated quantities are summarized.
+    logprob_name: str
+        Name of the log posterior column used to identify the mode.
+    rename: dict
+        Mapping used to rename the columns of the samples, such as
+        `{'Ka[1]': 'Ka'}`.
+    return_samples: bool
+        If True, the samples DataFrame of each group is also returned.
+    transform: callable
+        Function with signature `transform(g, samples_df)` applied to the
+        renamed samples of each group before they are summarized, such as
+        to add derived quantities. It must return the samples DataFrame. It
+        is called in the calling process, including for groups loaded from
+        `run_dir`.
+    cache_dir: str
+        Directory of compiled models. See `loadStanModel`.
+    run_dir: str
+        Directory in which the samples of each group are persisted as
+        Feather files. If None, nothing is saved.
+    **sampler_kwargs
+        Keyword arguments passed to `pystan.StanModel.sampling`, such as
+        `iter` or `control`. `n_jobs` defaults to 1 so that workers do not
+        spawn further processes.
+
+    Yields
+    ------
+    g: tuple or scalar
+        The group key.
+    summary_df: pandas DataFrame
+        The output of `mut.stats.compute_statistics` for the group with a
+        column for each key in `groupby`.
+    samples_df: pandas DataFrame or None
+        The samples of the group, one column per sampled quantity and
+        `lp__`, if `return_samples` is True.
+    """
+    if isinstance(model, StanModel):
+        cache_dir = model.cache_dir if cache_dir is None else cache_dir
+        model = model.file
+    if type(groupby) is str:
+        groupby = [groupby]
+    sampler_kwargs.setdefault('n_jobs', 1)
+    args = (groupby, varnames, logprob_name, transform, return_samples)
+
+    # Build the data dictionaries in the calling process.
+    groups = []
+    for g, d in df.groupby(groupby):
+        groups.append((g, build_data_dict(g, d)))
+
+    # Load the groups which were completed by a previous run.
+    if run_dir is not None:
+        os.makedirs(run_dir, exist_ok=True)
+        include_path = os.path.dirname(os.path.abspath(model))
+        settings = repr((_model_hash(model, include_path),
+                         sorted(rename.items()),
+                         sorted(sampler_kwargs.items())))
+        remaining = []
+        for g, data_dict in groups:
+            entry = os.path.join(run_dir, _group_key(g, data_dict, settings))
+            if os.path.exists(f'{entry}_samples.feather'):
+                samples_df = pd.read_feather(f'{entry}_samples.feather')
+                yield _summarize_group(g, samples_df, *args)
+            else:
+                remaining.append((g, data_dict, entry))
+    else:
+        remaining = [(g, data_dict, None) for g, data_dict in groups]
+    if len(remaining) == 0:
+        return
+
+    # Without a transform, each group is summarized in the worker and only
+    # the summary is sent back unless the samples are requested. A transform
+    # is applied in the calling process, where the state it reads lives.
+    def _summarize_args(g):
+        return None if transform is not None else (g,) + args
+
+    def _result(g, result):
+        if transform is None:
+            return result
+        return _summarize_group(g, result, *args)
+
+    if workers == 1:
+        for g, data_dict, entry in remaining:
+            yield _result(g, _sample_group(model, cache_dir, data_dict, rename,
+                                           sampler_kwargs, entry,
+                                           _summarize_args(g)))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ex:
+            futures = {ex.submit(_sample_group, model, cache_dir, data_dict,
+                                 rename, sampler_kwargs, entry,
+                                 _summarize_args(g)): g
+                       for g, data_dict, entry in remaining}
+            for future in concurrent.futures.as_completed(futures):
+                g = futures[future]
+                yield _result(g, future.result())
+
+
+def run_sbc(model, prior_sampler, data_builder, n_sims, thin=5, workers=None,
+            params=None, rename={}, logprob_name='lp__', cache_dir=None,
+            run_dir=None, **sampler_kwargs):
+    """
+    Performs simulation-based calibration of a Stan model. Each simulated
+    data set is fit independently across a pool of worker processes through
+    `sample_groups` and the rank statistic, z-score, and shrinkage of every
+    parameter are computed for all simulations at once.
+
+    Parameters
+    ----------
+    model: str or StanModel
+        Path to the Stan model file or a `StanModel` built from one.
+    prior_sampler: callable
+        Function with signature `prior_sampler(n_sims)` returning a
+        DataFrame of simulations in long format with a `sim_idx` column,
+        a column of the ground truth of each parameter in `params`, and the
+        simulated data. Only the first `n_sims` simulations are fit.
+    data_builder: callable
+        Function with signature `data_builder(g, d)` returning the data
+        dictionary of the model for the simulation key `g`, a tuple of the
+        `sim_idx`, and the simulation DataFrame `d`.
+    n_sims: int
+        Number of simulations to fit.
+    thin: int
+        Thinning of the posterior samples for the rank statistic.
+    workers: int
+        Number of worker processes. See `sample_groups`.
+    params: list of str
+        Parameters to calibrate after renaming. If None, all columns of the
+        prior samples named by the values of `rename` are used.
+    rename: dict
+        Mapping used to rename the columns of the samples, such as
+        `{'ep_RA[1]': 'ep_RA'}`.
+    logprob_name: str
+        Name of the log posterior column used to identify the mode.
+    cache_dir: str
+        Directory of compiled models. See `loadStanModel`.
+    run_dir: str
+        Directory in which each simulation is checkpointed as soon as it
+        finishes. An interrupted run is resumed from it. See
+        `sample_groups`.
+    **sampler_kwargs
+        Keyword arguments passed to `pystan.StanModel.sampling`.
+
+    Returns
+    -------
+    sbc_df: pandas DataFrame
+        Tidy table with one row per simulation and parameter of the
+        `ground_truth`, the posterior `post_mean`, `post_median`, and
+        `post_mode`, the `z_score`, the `shrinkage` relative to the variance
+        of the ground truth over all simulations, and the `rank` of the
+        ground truth among `rank_ndraws` thinned posterior samples.
+    """
+    prior = prior_sampler(n_sims)
+    sims = np.sort(prior['sim_idx'].unique())[:n_sims]
+    prior = prior[prior['sim_idx'].isin(sims)]
+    if params is None:
+        params = [p for p in rename.values() if p in prior.keys()]
+    truth = prior.groupby('sim_idx')[params].first()
+
+    # Collect the per-simulation statistics as (n_sims, n_params) arrays.
+    keys, stats = [], {k: [] for k in ['post_mean', 'post_median',
+                                       'post_mode', 'post_var', 'rank']}
+    for g, summary_df, samples_df in sample_groups(
+            model, prior, 'sim_idx', data_builder, workers=workers,
+            varnames=params, logprob_name=logprob_name, rename=rename,
+            return_samples=True, cache_dir=cache_dir, run_dir=run_dir,
+            **sampler_kwargs):
+        g = g[0] if type(g) is tuple else g
+        summary_df = summary_df.set_index('parameter').loc[params]
+        samples = samples_df[params].values
+        keys.append(g)
+        stats['post_mean'].append(summary_df['mean'].values)
+        stats['post_median'].append(summary_df['median'].values)
+        stats['post_mode'].append(summary_df['mode'].values)
+        stats['post_var'].append(np.var(samples, axis=0))
+        stats['rank'].append(np.sum(samples[::thin] < truth.loc[g].values,
+                                    axis=0))
+        rank_ndraws = len(samples[::thin])
+    order = np.argsort(keys)
+    stats = {k: np.array(v)[order] for k, v in stats.items()}
+    keys = np.array(keys)[order]
+    ground_truth = truth.loc[keys].values
+
+    # Compute the calibration statistics for all simulations at once.
+    z_score = (stats['post_mean'] - ground_truth) / np.sqrt(stats['post_var'])
+    shrinkage = 1 - stats['post_var'] / np.var(ground_truth, axis=0)
+    n_params = len(params)
+    return pd.DataFrame({'sim_idx': np.repeat(keys, n_params),
+                         'param': np.tile(params, len(keys)),
+                         'ground_truth': ground_truth.ravel(),
+                         'post_mean': stats['post_mean'].ravel(),
+                         'post_median': stats['post_median'].ravel(),
+                         'post_mode': stats['post_mode'].ravel(),
+                         'z_score': z_score.ravel(),
+                         'shrinkage': shrinkage.ravel(),
+                         'rank': stats['rank'].ravel(),
+                         'rank_ndraws': rank_ndraws})
+
+
+# Compiled model of a `sample_groups` worker process.
+_worker_model = None
+_worker_model_key = None
+
+
+def _sample_group(file, cache_dir, data_dict, rename, sampler_kwargs,
+                  entry=None, summarize=None):
+    """
+    Samples a single group of `sample_groups`. The compiled model is loaded
+    on the first call in each process. Only the sampled quantities and the
+    log posterior are kept. If `entry` is provided, the samples are saved
+    with it as prefix. If `summarize`, a tuple of the group key and the
+    remaining arguments of `_summarize_group`, is provided, the output of
+    `_summarize_group` is returned rather than the samples.
+    """
+    global _worker_model, _worker_model_key
+    if (_worker_model is None) or (_worker_model_key != (file, cache_dir)):
+        _worker_model = loadStanModel(file, cache_dir=cache_dir)
+        _worker_model_key = (file, cache_dir)
+    fit = _worker_model.sampling(data_dict, **sampler_kwargs)
+    samples_df = fit.to_dataframe(diagnostics=True)
+    samples_df = samples_df[[n for n in samples_df.columns
+                             if n not in ['chain', 'draw', 'warmup']
+                             and (n == 'lp__' or not n.endswith('__'))]]
+    samples_df = samples_df.rename(columns=rename)
+    if entry is not None:
+        _atomic_to_feather(samples_df, f'{entry}_samples.feather')
+    if summarize is not None:
+        return _summarize_group(summarize[0], samples_df, *summarize[1:])
+    return samples_df
+
+
+def _summarize_group(g, samples_df, groupby, varnames, logprob_name,
+                     transform, return_samples):
+    """
+    Transforms and summarizes the samples of a single group of
+    `sample_groups`.
+    """
+    if varnames is None:
+        # The sampled quantities, without the log posterior.
+        varnames = [n for n in samples_df.columns if not n.endswith('__')]
+    if transform is not None:
+        samples_df = transform(g, samples_df)
+    summary_df = compute_statistics(samples_df, varnames=varnames,
+                                    logprob_name=logprob_name)
+
+    # Add the group identifiers.
+    keys = g if type(g) is tuple else (g,)
+    for k, v in zip(groupby, keys):
+        summary_df[k] = v
+        samples_df[k] = v
+    if return_samples:
+        return g, summary_df, samples_df
+    return g, summary_df, None
+
+
+def _group_key(g, data_dict, settings):
+    """
+    Computes the run directory key of a group from the group key, the
+    contents of its data dictionary, and the run settings.
+    """
+    sha = hashlib.sha256(repr(g).encode())
+    for k in sorted(data_dict.keys()):
+        val = np.asarray(data_dict[k])
+        sha.update(f'{k}{val.dtype}{val.shape}'.encode())
+        sha.update(np.ascontiguousarray(val).tobytes())
+    sha.update(settings.encode())
+    return sha.hexdigest()
+
+
+def sample_empirical_F(df, groupby, fc_name='fold_change', n_draws=10000,
+                       n_grid=1000, sigma_scale=0.1, seed=None):
+    """
+    Draws posterior samples of the empirical fold-change model
+    (`Chure2019_empirical_F_inference.stan`) for every group of a DataFrame
+    at once without MCMC.
+
+    The model has a normal likelihood with mean `fc_mu` ~ Uniform(0, 1) and
+    standard deviation `fc_sigma` ~ HalfNormal(0, `sigma_scale`). Given
+    `fc_sigma`, the posterior of `fc_mu` is a normal distribution truncated
+    to [0, 1], so `fc_mu` can be integrated out analytically. The marginal
+    posterior of `fc_sigma` is evaluated on an adaptive grid in log
+    `fc_sigma` for all groups and sampled by inverse transform, after which
+    `fc_mu` is drawn exactly from its truncated normal conditional.
+
+    Parameters
+    ----------
+    df: pandas DataFrame
+        The fold-change measurements.
+    groupby: str or list of str
+        Column(s) defining the groups, each with its own `fc_mu` and
+        `fc_sigma`.
+    fc_name: str
+        Name of the fold-change column.
+    n_draws: int
+        Number of posterior draws per group.
+    n_grid: int
+        Number of points of the refined grid of `fc_sigma`.
+    sigma_scale: float
+        Scale of the half-normal prior on `fc_sigma`.
+    seed: int
+        Seed of the random number generator.
+
+    Returns
+    -------
+    keys: pandas DataFrame
+        The group keys, one row per group.
+    samples: dict
+        Arrays of shape (n_draws, n_groups) of `fc_mu`, `fc_sigma`, and the
+        log posterior `lp__` on the unconstrained scale as reported by Stan
+        up to a constant.
+    """
+    rng = np.random.RandomState(seed)
+    if type(groupby) is str:
+        groupby = [groupby]
+
+    # The posterior depends on the data only through N, the mean, and the
+    # sum of squared deviations.
+    grouped = df.groupby(groupby)[fc_name]
+    keys = grouped.size().reset_index()[groupby]
+    N = grouped.size().values.astype(float)
+    ybar = grouped.mean().values
+    ss = grouped.var(ddof=0).values * N
+
+    def _log_marginal(log_sigma):
+        # Log posterior of log(fc_sigma) with fc_mu integrated out.
+        sigma = np.exp(log_sigma)
+        sigma_m = sigma / np.sqrt(N[:, np.newaxis])
+        return (-0.5 * (sigma / sigma_scale)**2
+                - (N[:, np.newaxis] - 2) * log_sigma
+                - ss[:, np.newaxis] / (2 * sigma**2)
+                + _log_ndtr_diff(-ybar[:, np.newaxis] / sigma_m,
+                                 (1 - ybar[:, np.newaxis]) / sigma_m))
+
+    # Locate the bulk of the marginal on a coarse grid and refine it.
+    coarse = np.linspace(np.log(1E-6), np.log(10 * sigma_scale), 400)
+    logp = _log_marginal(np.broadcast_to(coarse, (len(N), len(coarse))))
+    bulk = logp > (logp.max(axis=1, keepdims=True) - 30)
+    step = coarse[1] - coarse[0]
+    lower = np.array([coarse[b].min() for b in bulk]) - step
+    upper = np.array([coarse[b].max() for b in bulk]) + step
+    fine = lower[:, np.newaxis] + (upper - lower)[:, np.newaxis] * \
+        np.linspace(0, 1, n_grid)[np.newaxis, :]
+    logp = _log_marginal(fine)
+
+    # Sample log(fc_sigma) by inverse transform of the piecewise constant
+    # density on the refined grid.
+    weights = np.exp(logp - logp.max(axis=1, keepdims=True))
+    cdf = np.cumsum(weights, axis=1)
+    cdf /= cdf[:, -1:]
+    # Offsetting each group by its index searches all groups at once.
+    offset = np.arange(len(N))[:, np.newaxis]
+    u = rng.random_sample((len(N), n_draws))
+    cells = np.searchsorted((cdf + offset).ravel(), (u + offset).ravel())
+    cells = np.clip(cells.reshape(u.shape) - offset * n_grid, 0, n_grid - 1)
+    width = (upper - lower)[:, np.newaxis] / (n_grid - 1)
+    log_sigma = np.take_along_axis(fine, cells, axis=1) + \
+        (rng.random_sample((len(N), n_draws)) - 0.5) * width
+    sigma = np.exp(log_sigma)
+
+    # Draw fc_mu from its truncated normal conditional. The interval is
+    # reflected to the lower tail where the normal CDF is accurate.
+    sigma_m = sigma / np.sqrt(N[:, np.newaxis])
+    a = -ybar[:, np.newaxis] / sigma_m
+    b = (1 - ybar[:, np.newaxis]) / sigma_m
+    flip = a > 0
+    lo = np.where(flip, -b, a)
+    hi = np.where(flip, -a, b)
+    import scipy.special
+    p_lo = scipy.special.ndtr(lo)
+    p_hi = scipy.special.ndtr(hi)
+    z = scipy.special.ndtri(p_lo + rng.random_sample(lo.shape) *
+                            (p_hi - p_lo))
+    z = np.where(flip, -z, z)
+    mu = ybar[:, np.newaxis] + sigma_m * z
+
+    # If the CDF underflows, the mass lies at the bound nearest the mean.
+    mu = np.where(np.isfinite(mu), mu, np.clip(ybar, 0, 1)[:, np.newaxis])
+    mu = np.clip(mu, 1E-300, 1 - 1E-16)
+
+    # Evaluate the log posterior as reported by Stan.
+    lp = (-0.5 * (sigma / sigma_scale)**2
+          - (N[:, np.newaxis] - 1) * log_sigma
+          - (ss[:, np.newaxis] + N[:, np.newaxis] *
+             (ybar[:, np.newaxis] - mu)**2) / (2 * sigma**2)
+          + np.log(mu) + np.log1p(-mu))
+    return keys, {'fc_mu': mu.T, 'fc_sigma': sigma.T, 'lp__': lp.T}
+
+
+def empirical_F_statistics(df, groupby, ref_name='ref_bohr',
+                           fc_name='fold_change', mass_frac=0.95,
+                           validate=None, **kwargs):
+    """
+    Computes the summary statistics of `empirical_bohr`, `fc_mu`,
+    `fc_sigma`, and `delta_bohr` for every group of a DataFrame from the
+    samples of `sample_empirical_F`.
+
+    Parameters
+    ----------
+    df: pandas DataFrame
+        The fold-change measurements.
+    groupby: str or list of str
+        Column(s) defining the groups.
+    ref_name: str
+        Name of the column with the reference Bohr parameter of each group,
+        which is subtracted from `empirical_bohr` to give `delta_bohr`.
+    fc_name: str
+        Name of the fold-change column.
+    mass_frac: float [0, 1]
+        The probability mass fraction of the HPD.
+    validate: pandas DataFrame
+        Statistics of the same groups computed from Stan samples, such as
+        `Chure2019_empirical_F_statistics.csv`. If provided, the comparison
+        of `compare_statistics` is returned as well.
+    **kwargs
+        Keyword arguments passed to `sample_empirical_F`.
+
+    Returns
+    -------
+    stats_df: pandas DataFrame
+        Statistics in the format of `mut.stats.compute_statistics` with a
+        column for each key in `groupby`.
+    comparison: pandas DataFrame
+        Returned only if `validate` is provided. See `compare_statistics`.
+    """
+    if type(groupby) is str:
+        groupby = [groupby]
+    keys, samples = sample_empirical_F(df, groupby, fc_name=fc_name,
+                                       **kwargs)
+    ref = df.groupby(groupby)[ref_name].first().values
+    samples['empirical_bohr'] = -np.log(samples['fc_mu']**-1 - 1)
+    samples['delta_bohr'] = samples['empirical_bohr'] - ref[np.newaxis, :]
+
+    # Compute the statistics of all groups at once for each parameter.
+    mode_ind = np.argmax(samples['lp__'], axis=0)
+    groups = np.arange(len(keys))
+    varnames = ['empirical_bohr', 'fc_mu', 'fc_sigma', 'delta_bohr']
+    stats = []
+    for v in varnames:
+        sorted_samples = np.sort(samples[v], axis=0)
+        hpd_min, hpd_max = _sorted_hpd(sorted_samples, mass_frac)
+        _df = keys.copy()
+        _df.insert(0, 'parameter', v)
+        _df.insert(1, 'mean', np.mean(samples[v], axis=0))
+        _df.insert(2, 'median', _sorted_median(sorted_samples))
+        _df.insert(3, 'mode', samples[v][mode_ind, groups])
+        _df.insert(4, 'hpd_min', hpd_min)
+        _df.insert(5, 'hpd_max', hpd_max)
+        stats.append(_df)
+
+    # Order the statistics by group as in a loop over the groups.
+    stats_df = pd.concat(stats).reset_index()
+    stats_df = stats_df.sort_values(['index'], kind='mergesort').drop(
+        columns='index').reset_index(drop=True)
+    if validate is not None:
+        return stats_df, compare_statistics(stats_df, validate, groupby)
+    return stats_df
+
+
+def compare_statistics(test_df, truth_df, groupby,
+                       statistics=['mean', 'median', 'hpd_min', 'hpd_max']):
+    """
+    Compares two tables of summary statistics of the same groups, such as
+    those of `empirical_F_statistics` and those computed from Stan samples.
+
+    Parameters
+    ----------
+    test_df, truth_df: pandas DataFrame
+        Statistics in the format of `mut.stats.compute_statistics` with a
+        column for each key in `groupby`.
+    groupby: list of str
+        Columns identifying the groups.
+    statistics: list of str
+        The statistics to compare.
+
+    Returns
+    -------
+    comparison: pandas DataFrame
+        One row per group and parameter present in both tables with the
+        absolute difference of each statistic (`<statistic>_diff`) and the
+        difference relative to the width of the HPD of `truth_df`
+        (`<statistic>_rel`).
+    """
+    merged = test_df.merge(truth_df, on=list(groupby) + ['parameter'],
+                           suffixes=('_test', '_truth'))
+    width = merged['hpd_max_truth'] - merged['hpd_min_truth']
+    comparison = merged[list(groupby) + ['parameter']].copy()
+    for s in statistics:
+        diff = np.abs(merged[f'{s}_test'] - merged[f'{s}_truth'])
+        comparison[f'{s}_diff'] = diff
+        comparison[f'{s}_rel'] = diff / width
+    return comparison
+
+
+def _log_ndtr_diff(a, b):
+    """Computes log(Phi(b) - Phi(a)) for b > a without cancellation."""
+    import scipy.special
+    flip = a > 0
+    log_hi = scipy.special.log_ndtr(np.where(flip, -a, b))
+    log_lo = scipy.special.log_ndtr(np.where(flip, -b, a))
+    return log_hi + np.log1p(-np.exp(log_lo - log_hi))
+
+
+def prior_predictive(model_name, n_draws, c, R=260, ep_r=-13.9, rng=None,
+                     ep_ai=4.5, n_sites=2, n_ns=4.6E6, chunk_size=None):
+    """
+    Draws prior predictive samples of the fold-change for the inducer
+    binding models `Chure2019_KaKi_only.stan` and
+    `Chure2019_KaKi_epAI.stan`. All parameters are drawn at once and the
+    fold-change is evaluated for every draw and concentration by
+    broadcasting.
+
+    The priors are Ka ~ LogNormal(2, 2), Ki ~ LogNormal(0, 2), sigma ~
+    HalfNormal(0, 0.1), and, for the `KaKi_epAI` model, ep_AI ~ Normal(0, 5).
+
+    Parameters
+    ----------
+    model_name: str
+        Name of the model, either 'KaKi_only' or 'KaKi_epAI'.
+    n_draws: int
+        Number of draws from the prior.
+    c: 1d-array
+        Effector concentrations at which the fold-change is evaluated.
+    R, ep_r: int or float
+        Number of repressors and repressor-DNA binding energy in k_BT.
+    rng: numpy RandomState, Generator, int, or None
+        Random number generator or a seed to create one.
+    ep_ai: int or float
+        Allosteric energy difference used by the `KaKi_only` model.
+    n_sites, n_ns: int or float
+        Number of effector binding sites and nonspecific binding sites.
+    chunk_size: int or None
+        If provided, a generator of DataFrames of at most `chunk_size` draws
+        each is returned so that very large numbers of draws can be
+        processed without holding them in memory.
+
+    Returns
+    -------
+    df: pandas DataFrame or generator of pandas DataFrames
+        Long-format samples with the columns `fc_draw`, `ep_a`, `ka`,
+        `ep_i`, `ki`, `ep_ai`, `sigma`, `draw`, `model`, and `IPTGuM`, one
+        row per draw and concentration.
+    """
+    if model_name not in ['KaKi_only', 'KaKi_epAI']:
+        raise ValueError("`model_name` must be 'KaKi_only' or 'KaKi_epAI'.")
+    if (rng is None) or isinstance(rng, (int, np.integer)):
+        rng = np.random.RandomState(rng)
+    c = np.asarray(c, dtype=float)
+    thermo._validate_mwc(c, 1, 1, ep_ai, n_sites)
+    thermo._validate_repression(R, n_ns)
+    args = (model_name, c, R, ep_r, rng, ep_ai, n_sites, n_ns)
+    if chunk_size is None:
+        return _prior_predictive_frame(0, n_draws, *args)
+    return (_prior_predictive_frame(start, min(chunk_size, n_draws - start),
+                                    *args)
+            for start in range(0, n_draws, chunk_size))
+
+
+def _prior_predictive_frame(start, n_draws, model_name, c, R, ep_r, rng,
+                            ep_ai, n_sites, n_ns):
+    """Draws a frame of prior predictive samples. See `prior_predictive`."""
+    ka = rng.lognormal(2, 2, n_draws)
+    ki = rng.lognormal(0, 2, n_draws)
+    if model_name == 'KaKi_epAI':
+        ep_ai = rng.normal(0, 5, n_draws)
+    else:
+        ep_ai = np.ones(n_draws) * ep_ai
+    sigma = np.abs(rng.normal(0, 0.1, n_draws))
+
+    # Evaluate the fold-change as an (n_draws, n_c) array.
+    fc = thermo.fold_change(R, ep_r, c[np.newaxis, :], ka[:, np.newaxis],
+                            ki[:, np.newaxis], ep_ai[:, np.newaxis], n_sites,
+                            n_ns)
+    fc_draw = rng.normal(fc, sigma[:, np.newaxis])
+
+    n_c = len(c)
+    return pd.DataFrame({'fc_draw': fc_draw.ravel(),
+                         'ep_a': np.repeat(np.log(ka), n_c),
+                         'ka': np.repeat(ka, n_c),
+                         'ep_i': np.repeat(np.log(ki), n_c),
+                         'ki': np.repeat(ki, n_c),
+                         'ep_ai': np.repeat(ep_ai, n_c),
+                         'sigma': np.repeat(sigma, n_c),
+                         'draw': np.repeat(np.arange(start, start + n_draws),
+                                           n_c),
+                         'model': model_name,
+                         'IPTGuM': np.tile(c, n_draws)})
+
+
+def loadStanModel(fname, force=False, cache_dir=None):
+    """
+    Loads a precompiled Stan model. If no compiled model is found, one will be
+    compiled and saved.
+
+    Compiled models are stored in `cache_dir` keyed by a hash of the model
+    source, the source of every file it pulls in through `#include`, and the
+    PyStan, compiler, and Python versions. A model is therefore only
+    recompiled when its code or toolchain changes. The cache may be shared by
+    concurrent processes; compilation of a given model is guarded by a file
+    lock and compiled models are written atomically.
+
+    Parameters
+    ----------
+    fname: str
+        Path to the Stan model file. Included files are searched for in the
+        directory of the model.
+    force: bool
+        If True, the model is compiled and the cached model replaced.
+    cache_dir: str
+        Directory of compiled models. If None, the `MUT_STAN_CACHE`
+        environment variable is used if set, otherwise `~/.cache/mut/stan`.
+
+    Returns
+    -------
+    model: pystan.StanModel
+        The compiled model.
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get('MUT_STAN_CACHE',
+                    os.path.join(os.path.expanduser('~'), '.cache', 'mut',
+                                 'stan'))
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Identify the model name and the cache entry.
+    include_path = os.path.dirname(os.path.abspath(fname))
+    sm_name = os.path.basename(fname).split('.stan')[0]
+    key = _model_hash(fname, include_path)
+    pkl_name = os.path.join(cache_dir, f'{sm_name}_{key[:16]}.pkl')
+
     # Check if the model is precompiled
-    if (os.path.exists(pkl_name)==True) and (force != True):
+    if (os.path.exists(pkl_name) == True) and (force != True):
         print('Found precompiled model. Loading...')
         model = pickle.load(open(pkl_name, 'rb'))
         print('finished!')
-    else:
-        print('Precompiled model not found. Compiling model...')
-        _path = rel + '/stan/'         
-        model = pystan.StanModel(fname, include_paths=_path)        
+        return model
+
+    with _file_lock(f'{pkl_name}.lock'):
+        # Another process may have compiled the model while waiting.
+        if (os.path.exists(pkl_name) == True) and (force != True):
+            print('Found precompiled model. Loading...')
+            model = pickle.load(open(pkl_name, 'rb'))
+        else:
+            print('Precompiled model not found. Compiling model...')
+            import pystan
+            model = pystan.StanModel(fname, include_paths=include_path)
+            tmp_name = f'{pkl_name}.{os.getpid()}.tmp'
+            with open(tmp_name, 'wb') as f:
+                pickle.dump(model, f)
+            os.replace(tmp_name, pkl_name)
         print('finished!')
-        with open(pkl_name, 'wb') as f:
-            pickle.dump(model, f)      
     return model
+
+
+def _model_hash(fname, include_path):
+    """
+    Computes the SHA-256 of a Stan model source, all files it includes, and
+    the versions of the toolchain used to compile it.
+    """
+    sha = hashlib.sha256()
+    for source in _stan_sources(fname, include_path):
+        with open(source, 'rb') as f:
+            sha.update(f.read())
+    for version in _toolchain_versions():
+        sha.update(version.encode())
+    return sha.hexdigest()
+
+
+def _stan_sources(fname, include_path, _seen=None):
+    """
+    Returns the paths of a Stan model and, recursively, all files it pulls in
+    through `#include` in the order in which they are included.
+    """
+    if _seen is None:
+        _seen = []
+    fname = os.path.abspath(fname)
+    if fname in _seen:
+        return _seen
+    _seen.append(fname)
+    with open(fname) as f:
+        for line in f:
+            match = re.match(r'\s*#include\s+[<"]?([^>"\s]+)[>"]?', line)
+            if match:
+                _stan_sources(os.path.join(include_path, match.group(1)),
+                              include_path, _seen)
+    return _seen
+
+
+def _toolchain_versions():
+    """
+    Returns the PyStan, C++ compiler, and Python versions used to compile
+    Stan models.
+    """
+    import pystan
+    versions = [f'pystan {pystan.__version__}', f'python {sys.version}']
+    compiler = sysconfig.get_config_var('CXX') or sysconfig.get_config_var(
+        'CC') or 'c++'
+    try:
+        out = subprocess.run(compiler.split() + ['--version'],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             timeout=60)
+        versions.append(out.stdout.decode(errors='replace'))
+    except (OSError, subprocess.SubprocessError):
+        versions.append(compiler)
+    return versions
+
+
+@contextlib.contextmanager
+def _file_lock(fname):
+    """
+    Holds an exclusive lock on `fname` for the duration of the context. On
+    platforms without `fcntl`, no lock is taken.
+    """
+    with open(fname, 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -1,13 +1,17 @@
+import os
+import hashlib
 import numpy as np
-import fcsparser
 import pandas as pd
-from ._fit_bivariate_normal_AstroML import fit_bivariate_normal
-import scipy.stats
+import concurrent.futures
+from ._fit_bivariate_normal_AstroML import fit_bivariate_normal, \
+    fit_bivariate_normal_streaming
+from .io import _atomic_to_feather
 
 # #######################
 # Automated Gating
 # #######################
-def fit_2D_gaussian(df, x_val='FSC-H', y_val='SSC-H', log=False):
+def fit_2D_gaussian(df, x_val='FSC-H', y_val='SSC-H', log=False,
+                    chunk_size=None, sketch_size=100000, seed=None):
     '''
     This function hacks astroML fit_bivariate_normal to return the mean
     and covariance matrix when fitting a 2D gaussian fuction to the data
@@ -15,12 +19,22 @@ def fit_2D_gaussian(df, x_val='FSC-H', y_val='SSC-H', log=False):
 
     Parameters
     ----------
-    df : DataFrame.
+    df : DataFrame or dict of arrays.
         dataframe containing the data from which to fit the distribution
     x_val, y_val : str.
         name of the dataframe columns to be used in the function
     log : bool.
         indicate if the log of the data should be use for the fit or not
+    chunk_size : int or None.
+        if provided, the data is read in chunks of this many events and the
+        fit is estimated in a single pass from a bounded-memory sketch of at
+        most `sketch_size` events. This permits fitting memory-mapped data
+        (see `read_fcs`) larger than the available memory. If None, the
+        exact fit over all events is computed.
+    sketch_size : int.
+        maximum number of events held in memory by the streaming fit.
+    seed : int or None.
+        seed of the random number generator of the streaming fit.
 
     Returns
     -------
@@ -32,15 +46,27 @@ def fit_2D_gaussian(df, x_val='FSC-H', y_val='SSC-H', log=False):
         cov[1, 1] = variance of the y_val column
         cov[0, 1] = cov[1, 0] = covariance of the data
     '''
-    if log:
-        x = np.log10(df[x_val])
-        y = np.log10(df[y_val])
+    if chunk_size is not None:
+        x, y = np.asarray(df[x_val]), np.asarray(df[y_val])
+        if log:
+            transform = np.log10
+        else:
+            transform = np.asarray
+        chunks = ((transform(x[i:i + chunk_size]),
+                   transform(y[i:i + chunk_size]))
+                  for i in range(0, len(x), chunk_size))
+        mu, sigma_1, sigma_2, alpha = fit_bivariate_normal_streaming(
+            chunks, sketch_size=sketch_size, seed=seed)
     else:
-        x = df[x_val]
-        y = df[y_val]
+        if log:
+            x = np.log10(df[x_val])
+            y = np.log10(df[y_val])
+        else:
+            x = df[x_val]
+            y = df[y_val]
 
-    # Fit the 2D Gaussian distribution using atroML function
-    mu, sigma_1, sigma_2, alpha = fit_bivariate_normal(x, y, robust=True)
+        # Fit the 2D Gaussian distribution using atroML function
+        mu, sigma_1, sigma_2, alpha = fit_bivariate_normal(x, y, robust=True)
 
     # compute covariance matrix from the standar deviations and the angle
     # that the fit_bivariate_normal function returns
@@ -57,7 +83,8 @@ def fit_2D_gaussian(df, x_val='FSC-H', y_val='SSC-H', log=False):
 
 
 # #################
-def gauss_interval(df, mu, cov, x_val='FSC-H', y_val='SSC-H', log=False):
+def gauss_interval(df, mu, cov, x_val='FSC-H', y_val='SSC-H', log=False,
+                   chunk_size=None):
     '''
     Computes the of the statistic
 
@@ -67,7 +94,7 @@ def gauss_interval(df, mu, cov, x_val='FSC-H', y_val='SSC-H', log=False):
 
     Parameters
     ----------
-    df : DataFrame.
+    df : DataFrame or dict of arrays.
         dataframe containing the data from which to fit the distribution
     mu : array-like.
         (x, y) location of bivariate normal
@@ -77,6 +104,9 @@ def gauss_interval(df, mu, cov, x_val='FSC-H', y_val='SSC-H', log=False):
         name of the dataframe columns to be used in the function
     log : bool.
         indicate if the log of the data should be use for the fit or not.
+    chunk_size : int or None.
+        number of events evaluated per vectorized pass. If None, all events
+        are evaluated at once. Smaller values cap the peak memory usage.
 
     Returns
     -------
@@ -89,35 +119,50 @@ def gauss_interval(df, mu, cov, x_val='FSC-H', y_val='SSC-H', log=False):
     if det == 0:
         raise NameError("The covariance matrix can't be singular")
 
-    # Compute the vector x defined as [[x - mu_x], [y - mu_y]]
-    if log is True:
-        x_vect = np.log10(np.array(df[[x_val, y_val]]))
-    else:
-        x_vect = np.array(df[[x_val, y_val]])
-
-    x_vect[:, 0] = x_vect[:, 0] - mu[0]
-    x_vect[:, 1] = x_vect[:, 1] - mu[1]
-
     # compute the inverse of the covariance matrix
     inv_sigma = np.linalg.inv(cov)
 
-    # compute the operation
-    interval_array = np.zeros(len(df))
-    for i, x in enumerate(x_vect):
-        interval_array[i] = np.dot(np.dot(x, inv_sigma), x.T)
+    return _mahalanobis(np.asarray(df[x_val]), np.asarray(df[y_val]), mu,
+                        inv_sigma, log=log, chunk_size=chunk_size)
+
+
+def _mahalanobis(x, y, mu, inv_sigma, log=False, chunk_size=None):
+    '''
+    Evaluates (x - µx)'Σ^-1(x - µx) for paired event arrays x and y in
+    vectorized chunks of at most `chunk_size` events.
+    '''
+    n_events = len(x)
+    if chunk_size is None or chunk_size <= 0:
+        chunk_size = max(n_events, 1)
+    a, b, d = inv_sigma[0, 0], inv_sigma[0, 1] + inv_sigma[1, 0], \
+        inv_sigma[1, 1]
+
+    interval_array = np.empty(n_events)
+    for start in range(0, n_events, chunk_size):
+        stop = start + chunk_size
+        if log is True:
+            dx = np.log10(x[start:stop]) - mu[0]
+            dy = np.log10(y[start:stop]) - mu[1]
+        else:
+            dx = x[start:stop] - mu[0]
+            dy = y[start:stop] - mu[1]
+
+        # Expand the quadratic form for the 2 x 2 case.
+        interval_array[start:stop] = a * dx**2 + b * dx * dy + d * dy**2
 
     return interval_array
 
 
 def gaussian_gate(df, alpha, x_val='FSC-A', y_val='SSC-A', log=True,
-                  verbose=False):
+                  verbose=False, chunk_size=None, fit_sample_size=None,
+                  sketch_size=None, seed=None):
     '''
     Function that applies an "unsupervised bivariate Gaussian gate" to the data
     over the channels x_val and y_val.
 
     Parameters
     ----------
-    df : DataFrame.
+    df : DataFrame or dict of arrays.
         dataframe containing the data from which to fit the distribution
     alpha : float. [0, 1]
         fraction of data aimed to keep. Used to compute the chi^2 quantile
@@ -128,34 +173,372 @@ def gaussian_gate(df, alpha, x_val='FSC-A', y_val='SSC-A', log=True,
         indicate if the log of the data should be use for the fit or not
     verbose : bool.
         indicate if the percentage of data kept should be print
+    chunk_size : int or None.
+        number of events evaluated per vectorized pass when computing the
+        gating statistic. See `gauss_interval`.
+    fit_sample_size : int or None.
+        if provided, the bivariate Gaussian is fit to a random subsample of
+        this many events and the resulting gate is applied to all events.
+        See `gate_sampling_error` to assess the effect on the gate.
+    sketch_size : int or None.
+        if provided, the bivariate Gaussian is fit in a single streaming pass
+        over chunks of `chunk_size` events (or `sketch_size` events if
+        `chunk_size` is None) from a sketch of at most this many events. See
+        `fit_2D_gaussian`. If None, the fit holds all (subsampled) events in
+        memory.
+    seed : int or None.
+        seed of the random number generator used to draw the subsample and
+        the streaming sketch.
 
     Returns
     -------
-    df_thresh : DataFrame
-        Pandas data frame to which the automatic gate was applied.
+    df_thresh : DataFrame or dict of arrays
+        Pandas data frame to which the automatic gate was applied. If `df` is
+        a dictionary of channel arrays (such as that returned by `read_fcs`),
+        a dictionary of the gated arrays is returned.
     '''
 
     # Perform sanity checks.
     if alpha < 0 or alpha > 1:
         return RuntimeError("`alpha` must be a float between 0 and 1.")
 
-    data = df[[x_val, y_val]]
+    idx = _gate_mask(df, alpha, x_val=x_val, y_val=y_val, log=log,
+                     chunk_size=chunk_size, fit_sample_size=fit_sample_size,
+                     sketch_size=sketch_size, seed=seed)
+
+    # print the percentage of data kept
+    if verbose:
+        print('''
+        with parameter alpha={0:0.2f}, percentage of data kept = {1:0.2f}
+        '''.format(alpha, np.sum(idx) / len(idx)))
+    if isinstance(df, pd.DataFrame):
+        return df[idx]
+    return {k: np.asarray(v)[idx] for k, v in df.items()}
+
+
+def _gate_mask(df, alpha, x_val='FSC-A', y_val='SSC-A', log=True,
+               chunk_size=None, fit_sample_size=None, sketch_size=None,
+               seed=None):
+    '''
+    Fits the bivariate Gaussian gate and returns the boolean mask of the
+    events falling within the interval. See `gaussian_gate`.
+    '''
     # Fit the bivariate Gaussian distribution
-    mu, cov = fit_2D_gaussian(data, log=log, x_val=x_val, y_val=y_val)
+    fit_df = df
+    n_events = len(df[x_val])
+    if (fit_sample_size is not None) and (fit_sample_size < n_events):
+        rng = np.random.RandomState(seed)
+        inds = np.sort(rng.choice(n_events, fit_sample_size, replace=False))
+        fit_df = {x_val: np.asarray(df[x_val])[inds],
+                  y_val: np.asarray(df[y_val])[inds]}
+    if sketch_size is not None:
+        fit_chunk_size = chunk_size
+        if (fit_chunk_size is None) or (fit_chunk_size <= 0):
+            fit_chunk_size = sketch_size
+        mu, cov = fit_2D_gaussian(fit_df, log=log, x_val=x_val, y_val=y_val,
+                                  chunk_size=fit_chunk_size,
+                                  sketch_size=sketch_size, seed=seed)
+    else:
+        mu, cov = fit_2D_gaussian(fit_df, log=log, x_val=x_val, y_val=y_val)
 
     # Compute the statistic for each of the pair of log scattering data
-    interval_array = gauss_interval(data, mu, cov, log=log,
-                                    x_val=x_val, y_val=y_val)
+    interval_array = gauss_interval(df, mu, cov, log=log,
+                                    x_val=x_val, y_val=y_val,
+                                    chunk_size=chunk_size)
 
     # Find which data points fall inside the interval
-    idx = interval_array <= scipy.stats.chi2.ppf(alpha, 2)
+    import scipy.stats
+    return interval_array <= scipy.stats.chi2.ppf(alpha, 2)
 
-    # print the percentage of data kept
-    if verbose:
-        print('''
-        with parameter alpha={0:0.2f}, percentage of data kept = {1:0.2f}
-        '''.format(alpha, np.sum(idx) / len(df)))
-    return df[idx]
+
+def gate_sampling_error(df, alpha, fit_sample_size, x_val='FSC-A',
+                        y_val='SSC-A', log=True, seed=None):
+    '''
+    Compares the gate fit to a random subsample of events with the gate fit
+    to all events.
+
+    Parameters
+    ----------
+    df : DataFrame or dict of arrays.
+        dataframe containing the data to be gated
+    alpha : float. [0, 1]
+        fraction of data aimed to keep. See `gaussian_gate`.
+    fit_sample_size : int.
+        number of events used to fit the subsampled gate.
+    x_val, y_val : str.
+        name of the dataframe columns to be used in the function
+    log : bool.
+        indicate if the log of the data should be use for the fit or not
+    seed : int or None.
+        seed of the random number generator used to draw the subsample.
+
+    Returns
+    -------
+    error : dict
+        Dictionary with the fraction of events kept by the full gate
+        (`full_fraction`) and by the subsampled gate (`sample_fraction`),
+        their difference (`fraction_change`), and the fraction of events
+        whose gate assignment differs between the two (`discordance`).
+    '''
+    full = _gate_mask(df, alpha, x_val=x_val, y_val=y_val, log=log)
+    sample = _gate_mask(df, alpha, x_val=x_val, y_val=y_val, log=log,
+                        fit_sample_size=fit_sample_size, seed=seed)
+    full_fraction = np.mean(full)
+    sample_fraction = np.mean(sample)
+    return {'full_fraction': full_fraction,
+            'sample_fraction': sample_fraction,
+            'fraction_change': sample_fraction - full_fraction,
+            'discordance': np.mean(full != sample)}
+
+
+def gate_plate(paths, alpha, workers=None, x_val='FSC-A', y_val='SSC-A',
+               log=True, channels=['FITC-H'], cache_dir=None):
+    '''
+    Applies the unsupervised bivariate Gaussian gate to a collection of flow
+    cytometry files in parallel and returns only the gated summary
+    statistics of each file.
+
+    Parameters
+    ----------
+    paths : list of str.
+        paths to the .csv or .fcs files of each sample.
+    alpha : float. [0, 1]
+        fraction of data aimed to keep. See `gaussian_gate`.
+    workers : int or None.
+        number of worker processes. If None, the number of processors on
+        the machine is used. If 1, files are gated in the calling process.
+    x_val, y_val : str.
+        name of the columns used to fit the gate.
+    log : bool.
+        indicate if the log of the data should be use for the fit or not
+    channels : list of str.
+        channels for which the mean of the gated events is reported.
+    cache_dir : str or None.
+        directory of the gate cache. If provided, gate masks and summaries
+        are loaded from and saved to the cache so that only samples whose
+        content or gating parameters changed are recomputed. See
+        `cached_gate`.
+
+    Returns
+    -------
+    summary_df : DataFrame
+        Pandas data frame with one row per file in the order of `paths`. The
+        columns are `file`, `events` (total number of events), `gated_events`
+        (number of events kept by the gate), and `mean_<channel>` for each
+        provided channel with dashes replaced by underscores.
+    '''
+    paths = list(paths)
+    args = (alpha, x_val, y_val, log, list(channels), cache_dir)
+    if workers == 1:
+        summaries = [_gate_summary(p, *args) for p in paths]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ex:
+            summaries = list(ex.map(_gate_summary, paths,
+                                    *[[a] * len(paths) for a in args]))
+    columns = ['file', 'events', 'gated_events'] + \
+              ['mean_{}'.format(c.replace('-', '_')) for c in channels]
+    return pd.DataFrame(summaries, columns=columns)
+
+
+def _gate_summary(path, alpha, x_val, y_val, log, channels, cache_dir=None):
+    '''
+    Loads and gates a single file, returning a dictionary of the summary
+    statistics. Used as the worker function of `gate_plate`.
+    '''
+    if cache_dir is not None:
+        _, summary = cached_gate(path, alpha, cache_dir, x_val=x_val,
+                                 y_val=y_val, log=log, channels=channels)
+        summary['file'] = path
+        return summary
+    data = _load_flow(path, [x_val, y_val] + channels)
+    idx = _gate_mask(data, alpha, x_val=x_val, y_val=y_val, log=log)
+    return _summarize_gate(path, data, idx, channels)
+
+
+def _summarize_gate(path, data, idx, channels):
+    '''
+    Computes the event counts and channel means of a gated sample.
+    '''
+    summary = {'file': path, 'events': len(idx),
+               'gated_events': int(np.sum(idx))}
+    for c in channels:
+        summary['mean_{}'.format(c.replace('-', '_'))] = np.mean(
+            np.asarray(data[c])[idx])
+    return summary
+
+
+def _load_flow(path, channels):
+    '''
+    Loads the provided channels of a .fcs or .csv flow cytometry file.
+    '''
+    if path.split('.')[-1].lower() == 'fcs':
+        return read_fcs(path, channels=list(dict.fromkeys(channels)))
+    return pd.read_csv(path)
+
+
+# #######################
+# Gate Caching
+# #######################
+def cached_gate(path, alpha, cache_dir, x_val='FSC-A', y_val='SSC-A',
+                log=True, channels=['FITC-H']):
+    '''
+    Gates a single flow cytometry file through a content-addressed on-disk
+    cache. Entries are keyed by the hash of the file contents together with
+    `alpha`, `x_val`, `y_val`, and `log`, so renamed files are still found
+    and any change to the data or the gate parameters results in a new
+    entry. The gate mask and the summary statistics are stored as Feather
+    files.
+
+    Parameters
+    ----------
+    path : str.
+        path to the .csv or .fcs file of the sample.
+    alpha : float. [0, 1]
+        fraction of data aimed to keep. See `gaussian_gate`.
+    cache_dir : str.
+        directory in which the cache entries are stored. It is created if it
+        does not exist.
+    x_val, y_val : str.
+        name of the columns used to fit the gate.
+    log : bool.
+        indicate if the log of the data should be use for the fit or not
+    channels : list of str.
+        channels for which the mean of the gated events is reported. If a
+        cached summary lacks one of these channels, it is recomputed from the
+        cached mask without refitting the gate.
+
+    Returns
+    -------
+    idx : 1d-array of bool.
+        mask of the events within the gate.
+    summary : dict.
+        event counts and mean of each channel over the gated events. See
+        `gate_plate`.
+    '''
+    os.makedirs(cache_dir, exist_ok=True)
+    key = _gate_key(path, alpha, x_val, y_val, log)
+    mask_file = os.path.join(cache_dir, '{}_mask.feather'.format(key))
+    summary_file = os.path.join(cache_dir, '{}_summary.feather'.format(key))
+    names = ['mean_{}'.format(c.replace('-', '_')) for c in channels]
+
+    # Load the mask and summary if present.
+    idx, summary = None, None
+    if os.path.exists(mask_file):
+        idx = pd.read_feather(mask_file)['gate'].values
+    if os.path.exists(summary_file):
+        summary = pd.read_feather(summary_file).iloc[0].to_dict()
+        if (idx is not None) and all(n in summary for n in names):
+            summary['file'] = path
+            return idx, summary
+
+    # Gate and/or summarize the sample.
+    data = _load_flow(path, [x_val, y_val] + list(channels))
+    if idx is None:
+        idx = _gate_mask(data, alpha, x_val=x_val, y_val=y_val, log=log)
+        _atomic_to_feather(pd.DataFrame({'gate': idx}), mask_file)
+    new_summary = _summarize_gate(path, data, idx, channels)
+    if summary is not None:
+        summary.update(new_summary)
+    else:
+        summary = new_summary
+    _atomic_to_feather(pd.DataFrame([{k: v for k, v in summary.items()
+                                      if k != 'file'}]), summary_file)
+    return idx, summary
+
+
+def _gate_key(path, alpha, x_val, y_val, log):
+    '''
+    Computes the cache key of a gated sample from the file contents and the
+    gate parameters.
+    '''
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            file_hash.update(block)
+    params = repr((float(alpha), x_val, y_val, bool(log)))
+    return hashlib.sha256('{}{}'.format(file_hash.hexdigest(),
+                                        params).encode()).hexdigest()
+
+
+# #######################
+# Fold-change Computation
+# #######################
+def compute_fold_change(summary_df, previous=None, run_keys=('date',),
+                        channel='mean_FITC_H', auto_name='auto',
+                        delta_name='delta'):
+    '''
+    Computes the fold-change of every sample from the gated summary
+    statistics by joining the autofluorescence and constitutive expression
+    (Δ-repressor) references with a single indexed merge. Autofluorescence
+    references are matched on `run_keys` and `IPTGuM`, Δ-repressor
+    references on `run_keys`, `IPTGuM`, and `operator`.
+
+    Parameters
+    ----------
+    summary_df : DataFrame
+        Summary statistics with one row per sample, such as the output of
+        `gate_plate` annotated with the `mutant`, `operator`, and `IPTGuM`
+        of each sample and the columns in `run_keys`.
+    previous : DataFrame or None.
+        fold-change table returned by a previous call. If provided, the
+        samples of `summary_df` are folded into it. Samples with the same
+        `file` as a new sample are replaced, and only the new samples and
+        those whose references gained or lost a sample are recomputed. Both
+        tables must have a `file` column.
+    run_keys : tuple or list of str.
+        columns identifying a single run so that references are not shared
+        between runs.
+    channel : str.
+        column of the mean fluorescence of each sample.
+    auto_name, delta_name : str.
+        values of `mutant` of the autofluorescence and Δ-repressor samples.
+
+    Returns
+    -------
+    fold_change_df : DataFrame
+        All samples with the columns `mean_auto` and `mean_delta` of the
+        matched references and `fold_change`. Replicate reference samples
+        are averaged. The fold-change of the autofluorescence samples and of
+        samples without a matching reference is NaN.
+    '''
+    auto_keys = list(run_keys) + ['IPTGuM']
+    delta_keys = list(run_keys) + ['IPTGuM', 'operator']
+    ref_cols = ['mean_auto', 'mean_delta', 'fold_change']
+    new = summary_df.drop(columns=ref_cols, errors='ignore')
+    if previous is None:
+        kept = new.iloc[:0].reindex(columns=list(new.columns) + ref_cols)
+        touched = new
+    else:
+        if ('file' not in previous) or ('file' not in new):
+            raise ValueError('`summary_df` and `previous` must have a `file` '
+                             'column to identify regated samples.')
+        replaced = previous['file'].isin(new['file'])
+        touched = pd.concat([previous[replaced], new])
+        kept = previous[~replaced]
+
+    # The references are computed from all reference samples of the table.
+    pooled = pd.concat([kept, new])
+    auto = pooled[pooled['mutant'] == auto_name].groupby(auto_keys)[
+        channel].mean().rename('mean_auto')
+    delta = pooled[pooled['mutant'] == delta_name].groupby(delta_keys)[
+        channel].mean().rename('mean_delta')
+
+    # Recompute the kept samples whose references changed.
+    def _keys(df, mutant, keys):
+        return df[df['mutant'] == mutant].groupby(keys).size().index
+    changed = (kept.set_index(auto_keys).index.isin(
+                   _keys(touched, auto_name, auto_keys)) |
+               kept.set_index(delta_keys).index.isin(
+                   _keys(touched, delta_name, delta_keys)))
+    samples = pd.concat([kept[changed].drop(columns=ref_cols), new])
+
+    fc_df = samples.join(auto, on=auto_keys).join(delta, on=delta_keys)
+    fc_df['fold_change'] = (fc_df[channel] - fc_df['mean_auto']) / \
+        (fc_df['mean_delta'] - fc_df['mean_auto'])
+    fc_df.loc[fc_df['mutant'] == auto_name, 'fold_change'] = np.nan
+    if previous is not None:
+        fc_df = pd.concat([kept[~changed], fc_df])
+    return fc_df.reset_index(drop=True)
 
 
 # #######################
@@ -182,6 +565,7 @@ def fcs_to_csv(path, file_name, save_metadata=True):
     if path.split('.')[-1] is not '.fcs':
         raise RuntimeError("`path` is not an FCS file.")
 
+    import fcsparser
     meta, data = fcsparser.parse(path)
     data.to_csv(file_name, index=False)
 
@@ -189,3 +573,118 @@ def fcs_to_csv(path, file_name, save_metadata=True):
         meta_df = pd.DataFrame(meta)
         meta_name = '{0}_metadata.csv'.format(path[:-4])
         meta_df.to_csv(meta_name, index=False)
+
+
+def read_fcs(path, channels=None):
+    R"""
+    Reads the requested channels of a list-mode Flow Cytometry Standard (FCS)
+    file without parsing the full file. The DATA segment is memory-mapped and
+    each channel is returned as a view into the mapping, so no event data is
+    copied or read from disk until it is used.
+
+    Parameters
+    ----------
+    path : str
+        Path to .fcs file
+    channels : list of str or None
+        Names of the channels (the `$PnN` keywords) to return. If None, all
+        channels are returned.
+
+    Returns
+    -------
+    data : dict
+        Dictionary of 1D arrays keyed by channel name in the order of
+        `channels`. Integer channels whose `$PnR` range does not fill the
+        stored bit width are masked and are therefore copies.
+
+    Raises
+    ------
+    ValueError
+        A ValueError is raised if the file is not a list-mode FCS file, uses
+        an unsupported data type or byte order, or does not contain one of
+        the requested channels.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(58).decode('ascii', errors='replace')
+        if header[:3] != 'FCS':
+            raise ValueError("`path` is not an FCS file.")
+        text_start, text_end, data_start, data_end = [
+            int(header[i:i + 8].strip() or 0) for i in range(10, 42, 8)]
+        f.seek(text_start)
+        text = f.read(text_end - text_start + 1).decode('latin-1')
+    meta = _parse_fcs_text(text)
+
+    # Large files store the data offsets in the TEXT segment.
+    if data_start == 0 or data_end == 0:
+        data_start = int(meta['$BEGINDATA'])
+        data_end = int(meta['$ENDDATA'])
+    if meta.get('$MODE', 'L').upper() != 'L':
+        raise ValueError("Only list-mode FCS files are supported.")
+
+    # Assemble the record layout of a single event.
+    byteord = meta['$BYTEORD'].replace(' ', '')
+    if byteord in ('1,2,3,4', '1,2', '1'):
+        order = '<'
+    elif byteord in ('4,3,2,1', '2,1'):
+        order = '>'
+    else:
+        raise ValueError("Byte order {} is not supported.".format(byteord))
+    datatype = meta['$DATATYPE'].upper()
+    n_par = int(meta['$PAR'])
+    names, formats, masks = [], [], []
+    for i in range(1, n_par + 1):
+        bits = int(meta['$P{}B'.format(i)])
+        names.append(meta['$P{}N'.format(i)])
+        if datatype == 'F':
+            formats.append(order + 'f4')
+            masks.append(None)
+        elif datatype == 'D':
+            formats.append(order + 'f8')
+            masks.append(None)
+        elif datatype == 'I':
+            if bits not in (8, 16, 32, 64):
+                raise ValueError(
+                    "Integer width of {} bits is not supported.".format(bits))
+            formats.append('{}u{}'.format(order, bits // 8))
+            p_range = int(float(meta['$P{}R'.format(i)]))
+            if p_range < 2**bits:
+                masks.append(2**int(np.ceil(np.log2(p_range))) - 1)
+            else:
+                masks.append(None)
+        else:
+            raise ValueError(
+                "Data type {} is not supported.".format(datatype))
+    record = np.dtype({'names': ['P{}'.format(i) for i in range(n_par)],
+                       'formats': formats})
+
+    # Determine the number of events and map the data segment.
+    n_events = int(meta.get('$TOT', (data_end - data_start + 1)
+                            // record.itemsize))
+    events = np.memmap(path, dtype=record, mode='r', offset=data_start,
+                       shape=(n_events,))
+
+    if channels is None:
+        channels = names
+    data = {}
+    for c in channels:
+        if c not in names:
+            raise ValueError("Channel {} not found in {}.".format(c, path))
+        ind = names.index(c)
+        arr = events['P{}'.format(ind)]
+        if masks[ind] is not None:
+            arr = np.bitwise_and(arr, masks[ind])
+        data[c] = arr
+    return data
+
+
+def _parse_fcs_text(text):
+    R"""
+    Parses the keyword-value pairs of an FCS TEXT segment into a dictionary
+    with upper case keywords.
+    """
+    delim = text[0]
+    # Doubled delimiters are escaped literal delimiters.
+    tokens = text[1:].replace(delim * 2, '\0').split(delim)
+    tokens = [t.replace('\0', delim) for t in tokens]
+    return {k.strip().upper(): v.strip() for k, v in zip(tokens[::2],
+                                                         tokens[1::2])}
@@ -1,8 +1,8 @@
 import numpy as np
-import frontmatter
 import pandas as pd
-import yaml
 import os
+import glob
+import shutil
 
 def scrape_frontmatter(dirname, file='README.md'):
     """
@@ -35,6 +35,7 @@ def scrape_frontmatter(dirname, file='README.md'):
         filename = '{}/{}'.format(dirname, file)
 
     # Scrape and return as desired.
+    import frontmatter
     with open(filename) as f:
         info, _ = frontmatter.parse(f.read())
     if 'status' not in info.keys():
@@ -49,3 +50,134 @@ def scrape_frontmatter(dirname, file='README.md'):
             info['status'].lower(), dirname))
         info = {}
     return info
+
+
+def _atomic_to_feather(df, fname):
+    """
+    Writes a DataFrame to a Feather file through a temporary file so readers
+    never observe a partially written entry.
+    """
+    tmp_name = '{}.{}.tmp'.format(fname, os.getpid())
+    df.to_feather(tmp_name)
+    os.replace(tmp_name, fname)
+
+
+def write_samples(df, store_dir, keys=['mutant', 'operator', 'repressors']):
+    """
+    Writes MCMC samples to a partitioned binary sample store. The samples of
+    each unique combination of `keys` are written to a Feather file in the
+    directory `store_dir/key1=value1/key2=value2/...`, so they can be read
+    individually and memory-mapped by `read_samples`. Floating point columns
+    are stored as single precision.
+
+    Parameters
+    ----------
+    df : pandas DataFrame
+        DataFrame of samples, one draw per row.
+    store_dir : str
+        Root directory of the sample store. All existing partitions of the
+        same keys are removed, so the store holds only the samples in `df`.
+    keys : list of str
+        Columns by which the samples are partitioned. These columns are not
+        stored in the files but restored from the directory names.
+    """
+    keys = list(keys)
+    draws = df.drop(columns=keys)
+    floats = draws.select_dtypes(include=['floating']).columns
+    draws = draws.astype({c: np.float32 for c in floats})
+    for stale in glob.glob(os.path.join(store_dir, '{}=*'.format(keys[0]))):
+        shutil.rmtree(stale)
+    for g, d in draws.groupby([df[k] for k in keys], sort=False):
+        if type(g) is not tuple:
+            g = (g,)
+        partition = os.path.join(store_dir, *['{}={}'.format(k, v)
+                                              for k, v in zip(keys, g)])
+        os.makedirs(partition, exist_ok=True)
+        _atomic_to_feather(d.reset_index(drop=True),
+                           os.path.join(partition, 'samples.feather'))
+
+
+def read_samples(store_dir, columns=None, memory_map=True, **filters):
+    """
+    Reads samples from a sample store written by `write_samples`.
+
+    Parameters
+    ----------
+    store_dir : str
+        Root directory of the sample store.
+    columns : list of str or None
+        Sample columns to read. If None, all columns are read.
+    memory_map : bool
+        If True, the files are memory-mapped rather than read into memory.
+    **filters
+        Values of the partition keys to read, such as `mutant='Q294K'` or
+        `operator=['O1', 'O2']`. Only matching partitions are opened.
+
+    Returns
+    -------
+    samples : pandas DataFrame
+        The samples of all matching partitions with the partition keys as
+        categorical columns.
+    """
+    import pyarrow.feather
+    dfs = []
+    keys = []
+    for partition in sample_partitions(store_dir, **filters):
+        path = partition.pop('path')
+        keys += [k for k in partition if k not in keys]
+        if memory_map:
+            path = pyarrow.memory_map(path)
+        table = pyarrow.feather.read_table(path, columns=columns)
+        df = table.to_pandas()
+        for k, v in partition.items():
+            df[k] = v
+        dfs.append(df)
+    if len(dfs) == 0:
+        return pd.DataFrame([])
+    df = pd.concat(dfs, ignore_index=True, sort=False)
+    return df.astype({k: 'category' for k in keys})
+
+
+def sample_partitions(store_dir, **filters):
+    """
+    Lists the partitions of a sample store written by `write_samples`.
+
+    Parameters
+    ----------
+    store_dir : str
+        Root directory of the sample store.
+    **filters
+        Values of the partition keys to list. See `read_samples`.
+
+    Returns
+    -------
+    partitions : list of dict
+        The key values of each partition and the `path` of its file.
+    """
+    partitions = []
+    files = glob.glob(os.path.join(store_dir, '**', 'samples.feather'),
+                      recursive=True)
+    for f in sorted(files):
+        rel = os.path.relpath(os.path.dirname(f), store_dir)
+        partition = dict(p.split('=', 1) for p in rel.split(os.sep))
+        partition = {k: _parse_key(v) for k, v in partition.items()}
+        match = True
+        for k, v in filters.items():
+            if type(v) not in (list, tuple, set):
+                v = [v]
+            if partition.get(k) not in v:
+                match = False
+        if match:
+            partition['path'] = f
+            partitions.append(partition)
+    return partitions
+
+
+def _parse_key(value):
+    """Converts a partition directory value to a number where possible."""
+    for dtype in (int, float):
+        try:
+            return dtype(value)
+        except ValueError:
+            pass
+    return value
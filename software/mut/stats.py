@@ -2,6 +2,7 @@
 import numpy as np
 import pandas as pd
 import glob
+from . import thermo
 
 def ecdf(data):
     """
@@ -30,27 +31,162 @@ def compute_statistics(df, varnames=None, logprob_name='logp'):
 
     # Get the vars we care about.
     if varnames is None:
-        varnames = [v for v in df.keys() if v is not 'logp']
+        varnames = [v for v in df.keys() if v != 'logp']
+    varnames = list(varnames)
 
     # Find the max of the log posterior.
     ind = np.argmax(df[logprob_name].values)
 
-    # Instantiate the dataframe for the parameters.
-    stat_df = pd.DataFrame([], columns=['parameter', 'mean', 'median', 'mode', 'hpd_min',
-                                        'hpd_max'])
-    for v in varnames:
-        mode = df.iloc[ind][v]
-        median = df[v].median()
-        mean = df[v].mean()
-        hpd_min, hpd_max = compute_hpd(df[v].values, mass_frac=0.95)
-        stat_dict = dict(parameter=v, median=median, mean=mean, mode=mode, hpd_min=hpd_min,
-                         hpd_max=hpd_max)
-        stat_df = stat_df.append(stat_dict, ignore_index=True)
+    # Sort all samples once and compute the statistics column-wise.
+    samples = df[varnames].values.astype(float)
+    sorted_samples = np.sort(samples, axis=0)
+    mode = samples[ind]
+    mean = np.nanmean(samples, axis=0)
+    median = _sorted_median(sorted_samples)
+    hpd_min, hpd_max = _sorted_hpd(sorted_samples, mass_frac=0.95)
 
+    # Instantiate the dataframe for the parameters.
+    stat_df = pd.DataFrame({'parameter': varnames, 'mean': mean,
+                            'median': median, 'mode': mode,
+                            'hpd_min': hpd_min, 'hpd_max': hpd_max},
+                           columns=['parameter', 'mean', 'median', 'mode',
+                                    'hpd_min', 'hpd_max'])
     return stat_df
 
 
-def compute_hpd(trace, mass_frac):
+class SummaryIndex(object):
+    R"""
+    An index of posterior summary statistics for constant time lookups.
+
+    Parameters
+    ----------
+    stats_df : pandas DataFrame
+        Summary statistics as returned by `compute_statistics`, optionally
+        concatenated over groups with the group identifiers as columns.
+    keys : list of str or None
+        Columns which uniquely identify each row. If None, the columns of
+        'mutant', 'operator', 'repressors', and 'IPTGuM' present in
+        `stats_df` are used along with 'parameter'.
+    statistics : list of str or None
+        Columns of statistics to index. If None, the columns of 'mean',
+        'median', 'mode', 'hpd_min', and 'hpd_max' present in `stats_df`
+        are used.
+    """
+
+    def __init__(self, stats_df, keys=None, statistics=None):
+        if keys is None:
+            keys = [k for k in ['mutant', 'operator', 'repressors', 'IPTGuM']
+                    if k in stats_df.keys()] + ['parameter']
+        if statistics is None:
+            statistics = [s for s in ['mean', 'median', 'mode', 'hpd_min',
+                                      'hpd_max'] if s in stats_df.keys()]
+        self.keys = list(keys)
+        self.statistics = list(statistics)
+        self._index = pd.MultiIndex.from_arrays(
+            [stats_df[k].values for k in self.keys], names=self.keys)
+        if self._index.has_duplicates:
+            dups = self._index[self._index.duplicated()].unique().tolist()
+            raise ValueError('keys {} do not uniquely identify rows, e.g. {}'
+                             .format(self.keys, dups[:5]))
+        self._rows = {k: i for i, k in enumerate(self._index.tolist())}
+        self._stats = {s: i for i, s in enumerate(self.statistics)}
+        self._values = stats_df[self.statistics].values.astype(float)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, statistic='median', **keys):
+        R"""
+        Returns a single summary statistic.
+
+        Parameters
+        ----------
+        statistic : str
+            The statistic to return.
+        **keys
+            The value of every key of the index, such as
+            `mutant='Q294K', operator='O2', parameter='Ka'`.
+
+        Returns
+        -------
+        value : float
+            The value of the statistic.
+        """
+        row = self._rows[self._key(keys)]
+        return self._values[row, self._stats[statistic]]
+
+    def lookup(self, statistic='median', **keys):
+        R"""
+        Returns summary statistics for arrays of keys.
+
+        Parameters
+        ----------
+        statistic : str or list of str
+            The statistic(s) to return.
+        **keys
+            The values of every key of the index. Values may be scalars or
+            array-like and are broadcast against each other.
+
+        Returns
+        -------
+        values : numpy array
+            The values of the statistic with the broadcast shape of the keys.
+            If a list of statistics is given, the statistics are along the
+            last axis.
+        """
+        self._key(keys)
+        arrays = np.broadcast_arrays(*[np.asarray(keys[k])
+                                       for k in self.keys])
+        shape = arrays[0].shape
+        query = pd.MultiIndex.from_arrays([a.ravel() for a in arrays],
+                                          names=self.keys)
+        rows = self._index.get_indexer(query)
+        if (rows < 0).any():
+            missing = query[rows < 0].unique().tolist()
+            raise KeyError('keys not found in the index: {}'.format(
+                missing[:5]))
+        if type(statistic) is str:
+            cols = self._stats[statistic]
+            return self._values[rows, cols].reshape(shape)
+        cols = [self._stats[s] for s in statistic]
+        return self._values[rows][:, cols].reshape(shape + (len(cols),))
+
+    def _key(self, keys):
+        """Checks the given key names and returns the key tuple."""
+        if set(keys) != set(self.keys):
+            raise KeyError('values for keys {} must be provided, got {}'
+                           .format(self.keys, list(keys)))
+        return tuple(keys[k] for k in self.keys)
+
+
+def _sorted_median(d):
+    R"""
+    Computes the median of each column of an array sorted along axis 0,
+    ignoring NaN values which are sorted to the end.
+    """
+    n = np.sum(~np.isnan(d), axis=0)
+    lower = np.maximum((n - 1) // 2, 0)
+    upper = n // 2
+    cols = np.arange(d.shape[1])
+    median = 0.5 * (d[lower, cols] + d[upper, cols])
+    median[n == 0] = np.nan
+    return median
+
+
+def _sorted_hpd(d, mass_frac):
+    R"""
+    Computes the HPD bounds along axis 0 of an array sorted along axis 0.
+    See `compute_hpd`.
+    """
+    n = len(d)
+    n_samples = np.floor(mass_frac * n).astype(int)
+    int_width = d[n_samples:] - d[:n - n_samples]
+    min_int = np.expand_dims(np.argmin(int_width, axis=0), 0)
+    return (np.take_along_axis(d, min_int, axis=0)[0],
+            np.take_along_axis(d, min_int + n_samples, axis=0)[0])
+
+
+def compute_hpd(trace, mass_frac, axis=0):
     R"""
     Returns highest probability density region given by
     a set of samples.
@@ -58,16 +194,24 @@ def compute_hpd(trace, mass_frac):
     Parameters
     ----------
     trace : array
-        1D array of MCMC samples for a single variable
+        Array of MCMC samples. For a 1D array, the HPD of the single
+        variable is computed. For higher dimensional arrays, such as a
+        (n_draws, n_points) matrix of a quantity evaluated at many points,
+        the HPD of every other index is computed along `axis`.
     mass_frac : float with 0 < mass_frac <= 1
         The fraction of the probability to be included in
         the HPD.  For hreple, `massfrac` = 0.95 gives a
         95% HPD.
+    axis : int
+        The axis of `trace` along which the samples are stored. Default
+        is 0.
 
     Returns
     -------
-    output : array, shape (2,)
-        The bounds of the HPD
+    output : array, shape (2,) or (2, ...)
+        The bounds of the HPD. The first index gives the lower and upper
+        bound, the remaining dimensions are those of `trace` without
+        `axis`.
 
     Notes
     -----
@@ -75,22 +219,176 @@ def compute_hpd(trace, mass_frac):
     http://bebi103.caltech.edu/2015/tutorials/l06_credible_regions.html
     """
     # Get sorted list
-    d = np.sort(np.copy(trace))
+    d = np.sort(np.moveaxis(np.asarray(trace), axis, 0), axis=0)
 
-    # Number of total samples taken
-    n = len(trace)
+    # Pick out the minimal interval and return.
+    return np.array(_sorted_hpd(d, mass_frac))
 
-    # Get number of samples that should be included in HPD
-    n_samples = np.floor(mass_frac * n).astype(int)
 
-    # Get width (in units of data) of all intervals with n_samples samples
-    int_width = d[n_samples:] - d[:n - n_samples]
+def credible_band(samples_df, c_range, quantity='fold_change',
+                  mass_frac=0.95, R=260, ep_r='ep_RA', ka='Ka', ki='Ki',
+                  ep_ai='ep_AI', n_sites=2, n_ns=4.6E6, chunk_size=None):
+    R"""
+    Computes the credible region and median of a thermodynamic quantity over
+    a range of effector concentrations given samples of the model parameters.
+    All draws are evaluated at all concentrations as a single
+    (n_draws, n_concentrations) array.
+
+    Parameters
+    ----------
+    samples_df : pandas DataFrame
+        DataFrame of posterior draws, one draw per row.
+    c_range : 1d-array
+        Effector concentrations at which to evaluate the quantity.
+    quantity : str
+        The quantity to evaluate. Must be 'fold_change', 'bohr_parameter',
+        or 'pact'. Default is 'fold_change'.
+    mass_frac : float with 0 < mass_frac <= 1
+        The fraction of the probability to be included in the HPD. Default
+        is 0.95.
+    R, ep_r, ka, ki, ep_ai, n_sites, n_ns : str, float, or 1d-array
+        Parameters of the `SimpleRepression` architecture. If a string is
+        provided, the values are taken from that column of `samples_df`.
+        Otherwise, the value is used for all draws or, if an array of length
+        n_draws is provided, for each draw. `R`, `ep_r`, and `n_ns` are not
+        used for 'pact'.
+    chunk_size : int or None
+        Maximum number of concentrations evaluated at once. This bounds the
+        memory to a (n_draws, chunk_size) array. If None, all
+        concentrations are evaluated at once.
+
+    Returns
+    -------
+    band : array, shape (2, len(c_range))
+        The lower and upper bounds of the HPD at each concentration.
+    median : 1d-array
+        The median of the quantity at each concentration.
+    """
+    if quantity not in ['fold_change', 'bohr_parameter', 'pact']:
+        raise ValueError(
+            "`quantity` must be 'fold_change', 'bohr_parameter', or 'pact'.")
+
+    # Assemble the per-draw parameters as column vectors.
+    def _draws(val):
+        if type(val) is str:
+            val = samples_df[val].values
+        val = np.asarray(val, dtype=float)
+        if val.ndim == 0:
+            return val
+        return val[:, np.newaxis]
+    mwc_pars = (_draws(ka), _draws(ki), _draws(ep_ai), _draws(n_sites))
+    if quantity != 'pact':
+        rep_pars = (_draws(R), _draws(ep_r))
+
+    c_range = np.asarray(c_range, dtype=float)
+    if chunk_size is None:
+        chunk_size = max(len(c_range), 1)
+    # Validate all concentrations and parameters once rather than per chunk.
+    thermo._validate_mwc(c_range, *mwc_pars)
+    if quantity != 'pact':
+        thermo._validate_repression(rep_pars[0], _draws(n_ns))
+    band = np.zeros((2, len(c_range)))
+    median = np.zeros(len(c_range))
+    for start in range(0, len(c_range), chunk_size):
+        c = c_range[np.newaxis, start:start + chunk_size]
+        if quantity == 'pact':
+            vals = thermo.pact(c, *mwc_pars)
+        else:
+            kernel = getattr(thermo, quantity)
+            vals = kernel(*rep_pars, c, *mwc_pars, n_ns=_draws(n_ns))
+
+        # Sort once for both the HPD and the median.
+        vals = np.sort(np.broadcast_to(vals, (vals.shape[0], c.shape[1])),
+                       axis=0)
+        hpd_min, hpd_max = _sorted_hpd(vals, mass_frac)
+        band[0, start:start + chunk_size] = hpd_min
+        band[1, start:start + chunk_size] = hpd_max
+        median[start:start + chunk_size] = _sorted_median(vals)
+    return band, median
+
+
+def empirical_F_limits(F_grid, sigma_grid, n_rep, n_sims=1, n_draws=2000,
+                       mass_frac=0.95, seed=None, chunk_size=None, **kwargs):
+    R"""
+    Computes the bias and the credible region width of the empirical free
+    energy inferred from simulated fold-change measurements over a grid of
+    true free energies and measurement noise.
+
+    For every pair of `F_grid` and `sigma_grid`, `n_sims` groups of `n_rep`
+    measurements are drawn from a normal distribution with mean
+    (1 + exp(-F))^-1 and standard deviation sigma. All groups are simulated
+    as a single array and their posteriors are sampled at once with
+    `mut.bayes.sample_empirical_F`.
+
+    Parameters
+    ----------
+    F_grid : 1d-array
+        The true free energies in units of kT.
+    sigma_grid : 1d-array
+        The standard deviations of the fold-change measurements.
+    n_rep : int
+        Number of measurements per simulated group.
+    n_sims : int
+        Number of simulated groups per grid point over which the surfaces
+        are averaged. Default is 1.
+    n_draws : int
+        Number of posterior draws per group. Default is 2000.
+    mass_frac : float with 0 < mass_frac <= 1
+        The fraction of the probability to be included in the HPD. Default
+        is 0.95.
+    seed : int or None
+        Seed of the random number generator.
+    chunk_size : int or None
+        Maximum number of groups inferred at once. This bounds the memory to
+        a few (n_draws, chunk_size) arrays. If None, all groups are inferred
+        at once.
+    **kwargs
+        Keyword arguments passed to `mut.bayes.sample_empirical_F`.
+
+    Returns
+    -------
+    bias : array, shape (len(F_grid), len(sigma_grid))
+        The mean over simulations of the posterior median of the empirical
+        free energy minus the true free energy.
+    width : array, shape (len(F_grid), len(sigma_grid))
+        The mean over simulations of the width of the HPD of the empirical
+        free energy.
+    """
+    # Imported here as mut.bayes depends on this module.
+    from .bayes import sample_empirical_F
+    rng = np.random.RandomState(seed)
+    F_grid = np.asarray(F_grid, dtype=float)
+    sigma_grid = np.asarray(sigma_grid, dtype=float)
+    shape = (len(F_grid), len(sigma_grid), n_sims)
+
+    # Simulate every group as one (n_groups, n_rep) array.
+    F = np.broadcast_to(F_grid[:, np.newaxis, np.newaxis], shape).ravel()
+    sigma = np.broadcast_to(sigma_grid[np.newaxis, :, np.newaxis],
+                            shape).ravel()
+    fc_mu = (1 + np.exp(-F))**-1
+    fc = rng.normal(fc_mu[:, np.newaxis], sigma[:, np.newaxis],
+                    (len(F), n_rep))
+
+    if chunk_size is None:
+        chunk_size = max(len(F), 1)
+    median = np.zeros(len(F))
+    width = np.zeros(len(F))
+    for start in range(0, len(F), chunk_size):
+        _fc = fc[start:start + chunk_size]
+        df = pd.DataFrame({'group': np.repeat(np.arange(len(_fc)), n_rep),
+                           'fold_change': _fc.ravel()})
+        _, samples = sample_empirical_F(df, 'group', n_draws=n_draws,
+                                        seed=rng.randint(2**31), **kwargs)
 
-    # Pick out minimal interval
-    min_int = np.argmin(int_width)
+        # Sort once for both the HPD and the median.
+        fc_samples = samples['fc_mu']
+        bohr = np.sort(np.log(fc_samples) - np.log1p(-fc_samples), axis=0)
+        hpd_min, hpd_max = _sorted_hpd(bohr, mass_frac)
+        median[start:start + chunk_size] = _sorted_median(bohr)
+        width[start:start + chunk_size] = hpd_max - hpd_min
 
-    # Return interval
-    return np.array([d[min_int], d[min_int + n_samples]])
+    bias = (median - F).reshape(shape).mean(axis=-1)
+    return bias, width.reshape(shape).mean(axis=-1)
 
 
 def compute_mean_sem(df):
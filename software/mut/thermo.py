@@ -4,6 +4,235 @@ regulatory architectures.
 """
 import numpy as np
 
+
+def pact(c, ka, ki, ep_ai, n=2, out=None, work=None, validate=False):
+    R"""
+    Computes the probability of the active state of an allosteric repressor
+    under the Monod - Wyman - Changeux model.
+
+    Parameters
+    ----------
+    c : int, float, or array
+        Concentration of the allosteric effector molecule.
+    ka, ki : ints, floats, or arrays
+        The effector dissociation constants for the active and inactive
+        state of the repressor.
+    ep_ai : int, float, or array
+        Difference in energy between the active and inactive allosteric
+        states of the repressor in units of k_BT.
+    n : int, float, or array
+        Number of cooperative effector binding sites on the repressor.
+        Default value is 2.
+    out : nd-array or None
+        If provided, the result is written into this array, which must have
+        the broadcast shape of the parameters.
+    work : nd-array or None
+        Workspace array with the shape of `out` for intermediate values. If
+        None and `out` is provided, one is allocated. Repeated evaluations
+        passing the same `out` and `work` allocate no memory.
+    validate : bool
+        If True, the parameters are checked as in `MWC`. Default is False.
+
+    Returns
+    -------
+    p_active : float or nd-array
+        The probability of the active state evaluated at each value of
+        c, ka, ki, ep_ai, and n.
+    """
+    if validate:
+        _validate_mwc(c, ka, ki, ep_ai, n)
+    if out is not None:
+        work = _work_array(out, work, c, ka, ki, ep_ai, n)
+        np.divide(c, ki, out=out)
+        np.add(1, out, out=out)
+        out **= n
+        np.negative(ep_ai, out=work)
+        np.exp(work, out=work)
+        np.multiply(work, out, out=work)
+        np.divide(c, ka, out=out)
+        np.add(1, out, out=out)
+        out **= n
+        np.add(out, work, out=work)
+        return np.divide(out, work, out=out)
+    numer = (1 + c / ka)**n
+    denom = numer + np.exp(-ep_ai) * (1 + c / ki)**n
+    return numer / denom
+
+
+def log_pact(c, ka, ki, ep_ai, n=2, out=None, work=None, validate=False):
+    R"""
+    Computes the natural logarithm of the probability of the active state.
+    This is evaluated as
+
+    log(pact) = -log(1 + exp(-ep_ai) * ((1 + c / ki) / (1 + c / ka))^n)
+
+    using `log1p` and `logaddexp` such that it does not overflow or
+    underflow at extreme effector concentrations or numbers of sites. See
+    `pact` for a description of the parameters.
+
+    Returns
+    -------
+    log_p_active : float or nd-array
+        The log probability of the active state evaluated at each value of
+        c, ka, ki, ep_ai, and n.
+    """
+    if validate:
+        _validate_mwc(c, ka, ki, ep_ai, n)
+    if out is not None:
+        work = _work_array(out, work, c, ka, ki, ep_ai, n)
+        np.divide(c, ki, out=out)
+        np.log1p(out, out=out)
+        np.divide(c, ka, out=work)
+        np.log1p(work, out=work)
+        np.subtract(out, work, out=out)
+        np.multiply(n, out, out=out)
+        np.subtract(out, ep_ai, out=out)
+        np.logaddexp(0, out, out=out)
+        return np.negative(out, out=out)
+    log_ratio = n * (np.log1p(c / ki) - np.log1p(c / ka))
+    return -np.logaddexp(0, log_ratio - ep_ai)
+
+
+def fold_change(R, ep_r, c, ka, ki, ep_ai, n=2, n_ns=4.6E6, out=None,
+                work=None, validate=False):
+    R"""
+    Computes the fold-change in gene expression for simple repression by an
+    allosteric repressor under the weak promoter approximation.
+
+    Parameters
+    ----------
+    R : int, float, or array
+        Number of repressors in the system (per cell).
+    ep_r : int, float or array
+        Repressor-DNA binding energy in units of k_BT.
+    c, ka, ki, ep_ai, n : ints, floats, or arrays
+        Parameters of the allosteric repressor. See `pact`.
+    n_ns : int or float
+        Number of nonspecific DNA binding sites for the repressor molecule.
+        Default value is the approximate length of the *E. coli* genome,
+        4.6e6 bp.
+    out, work : nd-arrays or None
+        Output and workspace arrays. See `pact`.
+    validate : bool
+        If True, the parameters are checked as in `SimpleRepression`.
+        Default is False.
+
+    Returns
+    -------
+    fold_change : float or nd-array
+        Fold-change in gene expression evaluated at each parameter value.
+    """
+    if validate:
+        _validate_repression(R, n_ns)
+    if out is not None:
+        work = _work_array(out, work, R, ep_r, c, ka, ki, ep_ai, n, n_ns)
+    p_active = pact(c, ka, ki, ep_ai, n, out=out, work=work,
+                    validate=validate)
+    return _fold_change(p_active, R, ep_r, n_ns, out=out, work=work)
+
+
+def log_fold_change(R, ep_r, c, ka, ki, ep_ai, n=2, n_ns=4.6E6, out=None,
+                    work=None, validate=False):
+    R"""
+    Computes the natural logarithm of the fold-change in gene expression as
+    log(fold_change) = -log(1 + exp(-bohr)) without exponentiating the
+    probability of the active state. See `fold_change` for a description of
+    the parameters.
+
+    Returns
+    -------
+    log_fold_change : float or nd-array
+        Log fold-change in gene expression evaluated at each parameter value.
+    """
+    bohr = bohr_parameter(R, ep_r, c, ka, ki, ep_ai, n, n_ns, out=out,
+                          work=work, validate=validate)
+    return _log_fold_change(bohr, out=out)
+
+
+def bohr_parameter(R, ep_r, c, ka, ki, ep_ai, n=2, n_ns=4.6E6, out=None,
+                   work=None, validate=False):
+    R"""
+    Computes the Bohr parameter of the form
+
+    bohr = k_BT(log(pact) + log(R / N_ns) + ep_r / k_BT)
+
+    from the log probability of the active state. See `fold_change` for a
+    description of the parameters.
+
+    Returns
+    -------
+    bohr : float or nd-array
+        The Bohr parameter evaluated at each parameter value.
+    """
+    if validate:
+        _validate_repression(R, n_ns)
+    if out is not None:
+        work = _work_array(out, work, R, ep_r, c, ka, ki, ep_ai, n, n_ns)
+    log_p_active = log_pact(c, ka, ki, ep_ai, n, out=out, work=work,
+                            validate=validate)
+    return _bohr_parameter(log_p_active, R, ep_r, n_ns, out=out, work=work)
+
+
+def induction_properties(draws, R, ep_r, ka='Ka', ki='Ki', ep_ai='ep_AI',
+                         n_sites=2, n_ns=4.6E6):
+    R"""
+    Computes the leakiness, saturation, dynamic range, EC50, and effective
+    Hill coefficient of an allosteric repressor for a collection of parameter
+    values, such as posterior draws, in a single pass sharing all
+    intermediate quantities.
+
+    Parameters
+    ----------
+    draws : pandas DataFrame, dict, or None
+        Collection of parameter values, one draw per row or entry.
+    R, ep_r, ka, ki, ep_ai, n_sites, n_ns : str, int, float, or array
+        Parameters of the `SimpleRepression` architecture. If a string is
+        provided, the values are taken from that column of `draws`.
+        Otherwise, the value is used for all draws.
+
+    Returns
+    -------
+    properties : dict
+        Dictionary of the 'leakiness', 'saturation', 'dynamic_range',
+        'EC50', and 'effective_hill' evaluated for each draw.
+    """
+    def _values(val):
+        if type(val) is str:
+            val = draws[val]
+        return np.asarray(val, dtype=float)
+    R, ep_r, ka, ki, ep_ai, n, n_ns = [_values(v) for v in
+                                       (R, ep_r, ka, ki, ep_ai, n_sites, n_ns)]
+
+    # Shared quantities of the MWC and repression terms.
+    exp_ai = np.exp(-ep_ai)
+    ka_ki = ka / ki
+    ka_ki_n = ka_ki**n
+    r = (R / n_ns) * np.exp(-ep_r)
+    repression = 1 + r
+
+    # Limits of zero and saturating effector.
+    leak = 1 / (1 + r / (1 + exp_ai))
+    sat = 1 / (1 + r / (1 + exp_ai * ka_ki_n))
+
+    # EC50 and the fold-change at the EC50.
+    numer = repression + ka_ki_n * (2 * exp_ai + repression)
+    denom = 2 * repression + exp_ai + ka_ki_n * exp_ai
+    ec50 = ka * (((ka_ki - 1) / (ka_ki - (numer / denom)**(1 / n))) - 1)
+    expanded_ka = 1 + ec50 / ka
+    expanded_ki = 1 + ec50 / ki
+    expanded_ka_n = expanded_ka**n
+    p_active = expanded_ka_n / (expanded_ka_n + exp_ai * expanded_ki**n)
+    fc = 1 / (1 + p_active * r)
+
+    # Effective Hill coefficient as the log derivative at the EC50.
+    prefactor = -fc**2 * r * 2 * ec50 * exp_ai
+    numer = expanded_ka * expanded_ki * (expanded_ki / ka - expanded_ka / ki)
+    denom = (expanded_ka**2 + exp_ai * expanded_ki**2)**2
+    hill = (2 / (fc - leak)) * prefactor * numer / denom
+    return {'leakiness': leak, 'saturation': sat, 'dynamic_range': sat - leak,
+            'EC50': ec50, 'effective_hill': hill}
+
+
 class MWC(object):
     R"""
     A base class for the Monod - Wyman - Changeux model for
@@ -11,7 +240,7 @@ class MWC(object):
     """
 
     def __init__(self, effector_conc=None, ka=None, ki=None, ep_ai=None,
-                 n_sites=2, log_transform=False):
+                 n_sites=2, log_transform=False, validate=True):
         """
         Parameters
         ----------
@@ -29,16 +258,11 @@ class MWC(object):
         n_sites : int, float or array
             Number of cooperative effector binding sites on the repressor.
             Default value is 2.
+        validate : bool
+            If True, the parameters are checked to be defined and positive
+            and ka and ki to be nonzero. Disabling the checks makes
+            construction in tight loops cheaper.
         """
-        kwargs = dict(effector_conc=effector_conc, ka=ka, ki=ki,
-                      ep_ai=ep_ai, n_sites=n_sites)
-
-        # Ensure values are provided.
-        for k in kwargs.keys():
-            if type(kwargs[k]) is None:
-                raise RuntimeError(
-                    "{0} is NoneType and must be defined.".format(k))
-
         # Assign the variables.
         self.c = effector_conc
         self.ep_ai = ep_ai
@@ -49,45 +273,49 @@ class MWC(object):
         else:
             self.ka = ka
             self.ki = ki
+        if validate:
+            _validate_mwc(self.c, self.ka, self.ki, self.ep_ai, self.n)
 
-        # Ensure ka and ki are not zero.
-        if type(ka) is float or int:
-            _ka = np.array([ka])
-        if type(ki) is float or int:
-            _ki = np.array([ki])
-
-        if (_ka == 0).any() or (_ki == 0).any():
-            raise ValueError('ka and/or ki cannot be zero.')
-
-        # Ensure positivity of values.
-        positive_kwargs = dict(effector_conc=self.c,
-                               ka=self.ka, ki=self.ki, n_sites=self.n)
-        for k in positive_kwargs.keys():
-            val = positive_kwargs[k]
-            if type(val) is float or int:
-                val = np.array([val])
-            if (val < 0).any():
-                raise RuntimeError('{0} must be positive.'.format(k))
-
-    def pact(self):
+    def pact(self, out=None):
         R"""
         Compute the probability of the active state at each provided parameter
         value
 
+        Parameters
+        ----------
+        out : nd-array or None
+            If provided, the result is written into this array, which must
+            have the broadcast shape of the parameters. Intermediate values
+            are computed in a workspace array reused between calls such that
+            repeated evaluations allocate no memory.
+
         Returns
         -------
         p_active : float or nd-array
             The probability of the active state evaluated at each value of
             effector_conc, ka, ki, and n_sites
         """
-        c = self.c
-        n = self.n
-        ka = self.ka
-        ki = self.ki
-        ep_ai = self.ep_ai
-        numer = (1 + c / ka)**n
-        denom = numer + np.exp(-ep_ai) * (1 + c / ki)**n
-        return numer / denom
+        args = (self.c, self.ka, self.ki, self.ep_ai, self.n)
+        return pact(*args, out=out, work=_workspace(self, out, *args))
+
+    def log_pact(self, out=None):
+        R"""
+        Computes the natural logarithm of the probability of the active
+        state without overflow or underflow. See `mut.thermo.log_pact`.
+
+        Parameters
+        ----------
+        out : nd-array or None
+            If provided, the result is written into this array. See `pact`.
+
+        Returns
+        -------
+        log_p_active : float or nd-array
+            The log probability of the active state evaluated at each value of
+            effector_conc, ka, ki, and n_sites
+        """
+        args = (self.c, self.ka, self.ki, self.ep_ai, self.n)
+        return log_pact(*args, out=out, work=_workspace(self, out, *args))
 
     def saturation(self):
         R"""
@@ -119,7 +347,7 @@ class SimpleRepression(object):
     repressor.
     """
 
-    def __init__(self, R, ep_r, n_ns=4.6e6, **kwargs):
+    def __init__(self, R, ep_r, n_ns=4.6e6, validate=True, **kwargs):
         R"""
         Instantiate the SimpleRepression object.
 
@@ -134,6 +362,9 @@ class SimpleRepression(object):
             repressor molecule.
             Default value is the approximate length of the *E.
             coli* genome, 4.6e6 bp.
+        validate : bool
+            If True, the parameters are checked to be positive. Disabling
+            the checks makes construction in tight loops cheaper.
         **kwargs : dict or tuple
             kwargs for allosteric transcription factors see `MWC`
             documentation for more information.
@@ -143,24 +374,18 @@ class SimpleRepression(object):
         self.ep_r = ep_r
         self.n_ns = n_ns
 
-        # Ensure values make sense.
-        positive_args = dict(R=R, n_ns=n_ns)
-        for p in positive_args.keys():
-            val = positive_args[p]
-            if type(val) is float or int:
-                val = np.array([val])
-            if (val < 0).any():
-                raise RuntimeError("{0} must be positive.".format(p))
+        if validate:
+            _validate_repression(R, n_ns)
 
         # Determine if transcription factor is allosteric
         if kwargs:
             self.allo = True
-            self.mwc = MWC(**kwargs)
+            self.mwc = MWC(validate=validate, **kwargs)
         else:
             self.allo = False
 
     def fold_change(self, wpa=True, num_pol=None, ep_pol=None,
-                    pact=False):
+                    pact=False, out=None):
         R"""
         fold - change for simple repression.
 
@@ -178,6 +403,11 @@ class SimpleRepression(object):
         pact : float or array
             The probability of having an active repressor. If None is
             provided, the probability will be computed given effector_conc.
+        out : nd-array or None
+            If provided, the result is written into this array, which must
+            have the broadcast shape of the parameters. Intermediate values
+            are computed in workspace arrays reused between calls such that
+            repeated evaluations allocate no memory.
 
         Returns
         -------
@@ -188,10 +418,29 @@ class SimpleRepression(object):
             pact = 1 
         else:
             if type(pact) == bool:
-                pact = self.mwc.pact()
-        # Compute repression and return inverse.
-        repression = (1 + pact * (self.R / self.n_ns) * np.exp(-self.ep_r))
-        return repression**-1
+                pact = self.mwc.pact(out=out)
+        args = (pact, self.R, self.ep_r, self.n_ns)
+        return _fold_change(*args, out=out, work=_workspace(self, out, *args))
+
+    def log_fold_change(self, out=None):
+        R"""
+        Computes the natural logarithm of the fold-change in gene expression
+        under the weak promoter approximation. This is evaluated from the
+        Bohr parameter as log(fold_change) = -log(1 + exp(-bohr)) without
+        exponentiating the probability of the active state.
+
+        Parameters
+        ----------
+        out : nd-array or None
+            If provided, the result is written into this array. See
+            `fold_change`.
+
+        Returns
+        -------
+        log_fold_change : float or nd-array
+            Log fold-change in gene expression evaluated at each value of c.
+        """
+        return _log_fold_change(self.bohr_parameter(out=out), out=out)
 
     def saturation(self, wpa=True, num_pol=None, ep_pol=0):
         R"""
@@ -334,30 +583,135 @@ class SimpleRepression(object):
         if self.allo == False:
             raise RuntimeError("Available for allosteric molecules only.")
 
-        # Compute the properties.
-        leak = self.leakiness()
-        sat = self.saturation()
-        dyn_rng = self.dynamic_range()
-        EC50 = self.ec50()
-        Hill = self.effective_hill()
-
-        return {'leakiness': leak, 'saturation': sat, 'dynamic_range':dyn_rng,
-                'EC50': EC50, 'effective_hill':Hill}
+        # Compute the properties in a single pass.
+        return induction_properties(None, self.R, self.ep_r, self.mwc.ka,
+                                    self.mwc.ki, self.mwc.ep_ai, self.mwc.n,
+                                    self.n_ns)
 
-    def bohr_parameter(self):
+    def bohr_parameter(self, out=None):
         R"""
         Computes the Bohr parameter of the form
 
         bohr = k_BT(log(pact) + log(R / N_ns) + ep_r / k_BT)
+
+        If provided, the result is written into the array `out` using
+        workspace arrays reused between calls. See `fold_change`.
         """
-        # Compute pact
+        # Compute the log of pact
         if self.allo is True:
-            pact = self.mwc.pact()
+            log_p_active = self.mwc.log_pact(out=out)
         else:
-            pact = 1
-        # Compute and return the Bohr.
-        bohr = self.ep_r - np.log(pact) - np.log(self.R / self.n_ns)
-        return bohr
+            log_p_active = 0
+        args = (log_p_active, self.R, self.ep_r, self.n_ns)
+        return _bohr_parameter(*args, out=out,
+                               work=_workspace(self, out, *args))
+
+
+def _fold_change(p_active, R, ep_r, n_ns, out=None, work=None):
+    """Computes the fold-change from the probability of the active state."""
+    if out is not None:
+        work = _work_array(out, work, R, ep_r, n_ns, inplace=p_active)
+        np.divide(R, n_ns, out=work)
+        np.multiply(p_active, work, out=out)
+        np.negative(ep_r, out=work)
+        np.exp(work, out=work)
+        np.multiply(out, work, out=out)
+        np.add(1, out, out=out)
+        return np.reciprocal(out, out=out)
+    # Compute repression and return inverse.
+    repression = (1 + p_active * (R / n_ns) * np.exp(-ep_r))
+    return repression**-1
+
+
+def _bohr_parameter(log_p_active, R, ep_r, n_ns, out=None, work=None):
+    """Computes the Bohr parameter from the log probability of the active
+    state."""
+    if out is not None:
+        work = _work_array(out, work, R, ep_r, n_ns, inplace=log_p_active)
+        np.subtract(ep_r, log_p_active, out=out)
+        np.divide(R, n_ns, out=work)
+        np.log(work, out=work)
+        return np.subtract(out, work, out=out)
+    return ep_r - log_p_active - np.log(R / n_ns)
+
+
+def _log_fold_change(bohr, out=None):
+    """Computes the log fold-change from the Bohr parameter."""
+    if out is not None:
+        np.negative(bohr, out=out)
+        np.logaddexp(0, out, out=out)
+        return np.negative(out, out=out)
+    return -np.logaddexp(0, -bohr)
+
+
+def _validate_mwc(c, ka, ki, ep_ai, n):
+    """
+    Ensures ka and ki are nonzero and the effector concentration, ka, ki,
+    and number of sites are positive.
+    """
+    if (np.asarray(ka) == 0).any() or (np.asarray(ki) == 0).any():
+        raise ValueError('ka and/or ki cannot be zero.')
+    positive_kwargs = dict(effector_conc=c, ka=ka, ki=ki, n_sites=n)
+    for k, val in positive_kwargs.items():
+        if (np.asarray(val) < 0).any():
+            raise RuntimeError('{0} must be positive.'.format(k))
+
+
+def _validate_repression(R, n_ns):
+    """Ensures the repressor copy number and nonspecific sites are
+    positive."""
+    for k, val in dict(R=R, n_ns=n_ns).items():
+        if (np.asarray(val) < 0).any():
+            raise RuntimeError("{0} must be positive.".format(k))
+
+
+def _check_out(out, *args):
+    """Raises a ValueError if the arguments do not broadcast to the shape of
+    `out`."""
+    shape = np.broadcast(out, *args).shape
+    if shape != out.shape:
+        raise ValueError('`out` must have the broadcast shape {} of the '
+                         'parameters.'.format(shape))
+
+
+def _work_array(out, work, *args, inplace=None):
+    """
+    Returns the workspace for evaluating into `out`, allocating one if
+    `work` is None. Raises a ValueError if the arguments do not broadcast to
+    the shape of `out`, `work` does not match it, or `out` or `work` share
+    memory with an argument, which the kernels overwrite before they finish
+    reading it. `inplace` is an argument which is only read elementwise by
+    the first write to `out` and so may be `out` itself.
+    """
+    _check_out(out, *args, *([] if inplace is None else [inplace]))
+    if any(np.shares_memory(out, a) for a in args):
+        raise ValueError('`out` must not share memory with the parameters.')
+    if inplace is not None:
+        args = args + (inplace,)
+    if (work is not None) and any(np.shares_memory(work, a) for a in args):
+        raise ValueError('`work` must not share memory with the parameters.')
+    if work is None:
+        return np.empty_like(out)
+    if (work.shape != out.shape) or (work.dtype != out.dtype):
+        raise ValueError('`work` must have the shape and type of `out`.')
+    return work
+
+
+def _workspace(obj, out, *args):
+    """
+    Returns a work array with the shape and type of `out`, cached on `obj`
+    so repeated evaluations over the same grid reuse it.
+    """
+    if out is None:
+        return None
+    _check_out(out, *args)
+    work = getattr(obj, '_work', None)
+    if (work is None) or (work.shape != out.shape) or \
+            (work.dtype != out.dtype):
+        work = np.empty_like(out)
+        obj._work = work
+    return work
+
 
 def load_constants():
     """Returns a dictionary of various constants incuding binding energies and copy numbers"""
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import threading
+import time
+sys.path.insert(0, '../')
+import mut.bayes
+import mut.thermo
+
+
+def test_empirical_F_statistics():
+    # Simulate a collection of groups spanning the range of fold-change.
+    np.random.seed(42)
+    fc_mu = np.array([0.001, 0.3, 0.7, 0.999])
+    df = pd.DataFrame({'group': np.repeat(np.arange(4), 6),
+                       'fold_change': np.random.normal(np.repeat(fc_mu, 6),
+                                                       0.05),
+                       'ref_bohr': 0})
+    stats = mut.bayes.empirical_F_statistics(df, 'group', seed=42)
+    assert list(stats['parameter'][:4]) == ['empirical_bohr', 'fc_mu',
+                                            'fc_sigma', 'delta_bohr']
+    assert len(stats) == 16
+
+    # Compute the posterior means by brute-force integration on a 2D grid.
+    mu, sigma = np.meshgrid(np.linspace(1E-6, 1 - 1E-6, 2000),
+                            np.linspace(1E-4, 0.5, 2000))
+    for g, d in df.groupby('group'):
+        y = d['fold_change'].values
+        logp = -0.5 * (sigma / 0.1)**2 - len(y) * np.log(sigma) - \
+            np.sum((y[:, np.newaxis, np.newaxis] - mu)**2, axis=0) / \
+            (2 * sigma**2)
+        p = np.exp(logp - logp.max())
+        p /= p.sum()
+        _stats = stats[stats['group'] == g].set_index('parameter')
+        assert _stats.loc['fc_mu', 'mean'] == pytest.approx(np.sum(p * mu),
+                                                            abs=2E-3)
+        assert _stats.loc['fc_sigma', 'mean'] == pytest.approx(
+            np.sum(p * sigma), rel=0.02)
+        for v in ['fc_mu', 'fc_sigma']:
+            assert _stats.loc[v, 'hpd_min'] <= _stats.loc[v, 'median'] \
+                <= _stats.loc[v, 'hpd_max']
+
+    # Ensure the validation compares with another set of statistics.
+    _, comparison = mut.bayes.empirical_F_statistics(df, 'group', seed=1,
+                                                     validate=stats)
+    assert len(comparison) == 16
+    assert (comparison['median_rel'] < 0.1).all()
+
+
+def test_prior_predictive():
+    c = np.logspace(-2, 4, 12)
+    df = mut.bayes.prior_predictive('KaKi_epAI', 1000, c, rng=42)
+    assert len(df) == 12000
+    assert list(df.columns) == ['fc_draw', 'ep_a', 'ka', 'ep_i', 'ki',
+                                'ep_ai', 'sigma', 'draw', 'model', 'IPTGuM']
+    assert (df.groupby('draw')['IPTGuM'].apply(list) == [list(c)] * 1000).all()
+    assert np.exp(df['ep_a']).values == pytest.approx(df['ka'].values)
+
+    # Ensure the draws follow the priors and the fold-change model.
+    draws = df.drop_duplicates('draw')
+    assert draws['ep_a'].mean() == pytest.approx(2, abs=0.3)
+    assert draws['ep_i'].std() == pytest.approx(2, abs=0.3)
+    assert draws['ep_ai'].std() == pytest.approx(5, abs=0.5)
+    fc = mut.thermo.fold_change(260, -13.9, df['IPTGuM'].values,
+                                df['ka'].values, df['ki'].values,
+                                df['ep_ai'].values)
+    z = (df['fc_draw'] - fc) / df['sigma']
+    assert z.mean() == pytest.approx(0, abs=0.05)
+    assert z.std() == pytest.approx(1, abs=0.05)
+
+    # Ensure the allosteric energy is fixed for the KaKi_only model.
+    df = mut.bayes.prior_predictive('KaKi_only', 10, c, rng=42)
+    assert (df['ep_ai'] == 4.5).all()
+
+    # Ensure streaming yields all draws in chunks.
+    chunks = list(mut.bayes.prior_predictive('KaKi_only', 25, c,
+                                             chunk_size=10))
+    assert [len(d) for d in chunks] == [120, 120, 60]
+    assert (pd.concat(chunks)['draw'].unique() == np.arange(25)).all()
+    with pytest.raises(ValueError):
+        mut.bayes.prior_predictive('DNA', 10, c)
+
+
+class _CompiledModel(object):
+    # Stands in for a compiled pystan.StanModel in `test_loadStanModel`.
+    n_compiled = 0
+
+    def __init__(self, file, include_paths=None):
+        _CompiledModel.n_compiled += 1
+        self.file = file
+
+
+def test_loadStanModel(tmp_path, monkeypatch):
+    monkeypatch.setattr(mut.bayes, '_toolchain_versions',
+                        lambda: ['pystan 2.18.0.0', 'python 3.6.7'])
+    pystan = type(sys)('pystan')
+    pystan.StanModel = _CompiledModel
+    monkeypatch.setitem(sys.modules, 'pystan', pystan)
+    functions = tmp_path / 'Chure2019_functions.stan'
+    functions.write_text('real pact(real c) { return c; }\n')
+    model = tmp_path / 'model.stan'
+    model.write_text('functions {\n  #include Chure2019_functions.stan\n}\n')
+    cache = str(tmp_path / 'cache')
+
+    # Ensure the sources include the included file.
+    sources = mut.bayes._stan_sources(str(model), str(tmp_path))
+    assert sources == [str(model), str(functions)]
+
+    # Ensure an unchanged source reuses the compiled model.
+    key = mut.bayes._model_hash(str(model), str(tmp_path))
+    mut.bayes.loadStanModel(str(model), cache_dir=cache)
+    mut.bayes.loadStanModel(str(model), cache_dir=cache)
+    assert _CompiledModel.n_compiled == 1
+    assert mut.bayes._model_hash(str(model), str(tmp_path)) == key
+
+    # Ensure editing the included file changes the key and recompiles.
+    functions.write_text('real pact(real c) { return 2 * c; }\n')
+    assert mut.bayes._model_hash(str(model), str(tmp_path)) != key
+    mut.bayes.loadStanModel(str(model), cache_dir=cache)
+    assert _CompiledModel.n_compiled == 2
+
+    # Ensure a held lock blocks other holders until it is released.
+    lock = str(tmp_path / 'model.lock')
+    acquired = threading.Event()
+    def _acquire():
+        with mut.bayes._file_lock(lock):
+            acquired.set()
+    with mut.bayes._file_lock(lock):
+        thread = threading.Thread(target=_acquire)
+        thread.start()
+        time.sleep(0.2)
+        assert not acquired.is_set()
+    thread.join(5)
+    assert acquired.is_set()
+
+
+def test_run_sbc(tmp_path, monkeypatch):
+    pytest.importorskip('pystan')
+    model = tmp_path / 'normal.stan'
+    model.write_text("""
+        data { int<lower=1> N; vector[N] fc; }
+        parameters { real mu; }
+        model { mu ~ normal(0, 1); fc ~ normal(mu, 1); }
+        """)
+
+    def prior_sampler(n_sims):
+        mu = np.random.normal(0, 1, n_sims)
+        return pd.DataFrame({'sim_idx': np.repeat(np.arange(n_sims), 5),
+                             'mu': np.repeat(mu, 5),
+                             'fc': np.random.normal(np.repeat(mu, 5), 1)})
+
+    def data_builder(g, d):
+        return {'N': len(d), 'fc': d['fc'].values}
+
+    np.random.seed(42)
+    sbc_df = mut.bayes.run_sbc(str(model), prior_sampler, data_builder, 20,
+                               thin=5, workers=1, params=['mu'], iter=1000,
+                               chains=2, cache_dir=str(tmp_path),
+                               run_dir=str(tmp_path / 'run'))
+    assert list(sbc_df['sim_idx']) == list(range(20))
+    assert (sbc_df['rank_ndraws'] == 200).all()
+    assert ((sbc_df['rank'] >= 0) & (sbc_df['rank'] <= 200)).all()
+    assert np.abs(sbc_df['z_score']).max() < 5
+    assert sbc_df['shrinkage'].mean() == pytest.approx(5 / 6, abs=0.2)
+
+    # Ensure a second run loads every simulation without sampling.
+    def _fail(*args, **kwargs):
+        raise AssertionError('completed groups must not be resampled')
+    monkeypatch.setattr(type(mut.bayes._worker_model), 'sampling', _fail)
+    np.random.seed(42)
+    resumed = mut.bayes.run_sbc(str(model), prior_sampler, data_builder, 20,
+                                thin=5, workers=1, params=['mu'], iter=1000,
+                                chains=2, cache_dir=str(tmp_path),
+                                run_dir=str(tmp_path / 'run'))
+    pd.testing.assert_frame_equal(resumed, sbc_df)
+
+    # Ensure a changed transform is applied to the loaded samples.
+    np.random.seed(42)
+    prior = prior_sampler(20)
+    for shift in [1, 2]:
+        def transform(g, samples_df):
+            samples_df['mu_shift'] = samples_df['mu'] + shift
+            return samples_df
+        for g, summary_df, samples_df in mut.bayes.sample_groups(
+                str(model), prior, 'sim_idx', data_builder, workers=1,
+                varnames=['mu', 'mu_shift'], transform=transform,
+                return_samples=True, iter=1000, chains=2,
+                cache_dir=str(tmp_path), run_dir=str(tmp_path / 'run')):
+            assert list(samples_df.columns[:2]) == ['mu', 'lp__']
+            summary_df = summary_df.set_index('parameter')
+            assert summary_df.loc['mu_shift', 'mean'] == pytest.approx(
+                summary_df.loc['mu', 'mean'] + shift)
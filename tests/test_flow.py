@@ -3,7 +3,9 @@ import pandas as pd
 import numpy as np
 import pytest
 import scipy.stats
+import os
 import sys
+import time
 sys.path.insert(0, '../')
 from mut.flow import *
 np.random.seed(42)
@@ -53,3 +55,259 @@ def test_gaussian_gate():
     # Run the tests
     _test_fn(alpha_range, False)
     _test_fn(alpha_range, True)
+
+
+def test_gauss_interval():
+    # Per-event reference implementation of the statistic.
+    def _loop_interval(x_vect, mu, cov):
+        inv_sigma = np.linalg.inv(cov)
+        interval_array = np.zeros(len(x_vect))
+        for i, x in enumerate(x_vect - np.asarray(mu)):
+            interval_array[i] = np.dot(np.dot(x, inv_sigma), x.T)
+        return interval_array
+
+    mean = [1E4, 1E3]
+    cov = [[100, 30], [30, 50]]
+    n_samples = 200000
+    rnd_df = pd.DataFrame(np.random.multivariate_normal(mean, cov, n_samples),
+                          columns=['x', 'y'])
+    mu, fit_cov = fit_2D_gaussian(rnd_df, x_val='x', y_val='y', log=True)
+
+    # Ensure the vectorized statistic matches the loop for all chunkings.
+    loop_start = time.perf_counter()
+    truth = _loop_interval(np.log10(rnd_df[['x', 'y']].values), mu, fit_cov)
+    loop_time = time.perf_counter() - loop_start
+    for chunk_size in [None, 1, 999, n_samples, 10 * n_samples]:
+        if chunk_size == 1:
+            _df = rnd_df.iloc[:1000]
+            _truth = truth[:1000]
+        else:
+            _df = rnd_df
+            _truth = truth
+        test = gauss_interval(_df, mu, fit_cov, x_val='x', y_val='y',
+                              log=True, chunk_size=chunk_size)
+        assert test.shape == (len(_df),)
+        assert test == pytest.approx(_truth, rel=1E-8)
+
+    # Benchmark the vectorized pass against the per-event loop.
+    vect_start = time.perf_counter()
+    gauss_interval(rnd_df, mu, fit_cov, x_val='x', y_val='y', log=True)
+    vect_time = time.perf_counter() - vect_start
+    assert vect_time < loop_time
+
+    # Ensure singular matrices are still caught.
+    with pytest.raises(NameError):
+        gauss_interval(rnd_df, mu, np.zeros((2, 2)), x_val='x', y_val='y')
+
+
+def test_gate_plate(tmp_path):
+    # Write a small plate of synthetic samples to disk.
+    paths = []
+    for i in range(4):
+        rnd = np.random.multivariate_normal([1E4, 1E4, 100 * (i + 1)],
+                                            np.diag([100, 100, 10]), 5000)
+        _df = pd.DataFrame(rnd, columns=['FSC-A', 'SSC-A', 'FITC-H'])
+        path = str(tmp_path / 'sample_{}.csv'.format(i))
+        _df.to_csv(path, index=False)
+        paths.append(path)
+
+    serial = gate_plate(paths, 0.4, workers=1)
+    parallel = gate_plate(paths, 0.4, workers=2)
+    assert list(serial.columns) == ['file', 'events', 'gated_events',
+                                    'mean_FITC_H']
+    assert list(serial['file']) == paths
+    assert serial.equals(parallel)
+
+    # Ensure the summaries match gating each file individually.
+    for p, (_, row) in zip(paths, serial.iterrows()):
+        gated = gaussian_gate(pd.read_csv(p), 0.4)
+        assert row['events'] == 5000
+        assert row['gated_events'] == len(gated)
+        assert row['mean_FITC_H'] == pytest.approx(gated['FITC-H'].mean())
+
+
+def test_read_fcs():
+    fcs_data = read_fcs(test_path, channels=['FSC-A', 'SSC-A', 'FITC-A'])
+    assert list(fcs_data.keys()) == ['FSC-A', 'SSC-A', 'FITC-A']
+    for k, v in fcs_data.items():
+        assert (np.asarray(v) == data[k].values).all()
+        # Ensure the channels are views into the mapped file.
+        assert not v.flags['OWNDATA']
+    assert list(read_fcs(test_path).keys()) == list(data.columns)
+
+    with pytest.raises(ValueError):
+        read_fcs(test_path, channels=['not a channel'])
+
+    # Ensure gating the arrays matches gating the DataFrame.
+    _data = data[data['FSC-A'] > 0]
+    _data = _data[_data['SSC-A'] > 0]
+    pos = (fcs_data['FSC-A'] > 0) & (fcs_data['SSC-A'] > 0)
+    fcs_data = {k: v[pos] for k, v in fcs_data.items()}
+    gated_df = gaussian_gate(_data, 0.4)
+    gated_arr = gaussian_gate(fcs_data, 0.4)
+    assert len(gated_arr['FITC-A']) == len(gated_df)
+    assert (gated_arr['FITC-A'] == gated_df['FITC-A'].values).all()
+
+
+def test_cached_gate(tmp_path):
+    rnd = np.random.multivariate_normal([1E4, 1E4, 100], np.diag([100, 100, 10]),
+                                        5000)
+    path = str(tmp_path / 'sample.csv')
+    pd.DataFrame(rnd, columns=['FSC-A', 'SSC-A', 'FITC-H']).to_csv(path,
+                                                                   index=False)
+    cache_dir = str(tmp_path / 'cache')
+
+    # Ensure the cached gate matches the direct gate.
+    idx, summary = cached_gate(path, 0.4, cache_dir)
+    gated = gaussian_gate(pd.read_csv(path), 0.4)
+    assert idx.sum() == len(gated) == summary['gated_events']
+    assert summary['mean_FITC_H'] == pytest.approx(gated['FITC-H'].mean())
+    assert len(os.listdir(cache_dir)) == 2
+
+    # Ensure a rerun is served from the cache and new parameters are not.
+    _idx, _summary = cached_gate(path, 0.4, cache_dir)
+    assert (_idx == idx).all()
+    assert _summary == summary
+    cached_gate(path, 0.6, cache_dir)
+    assert len(os.listdir(cache_dir)) == 4
+
+    # Ensure a summary can be extended with new channels from the mask.
+    _, _summary = cached_gate(path, 0.4, cache_dir, channels=['FSC-A'])
+    assert _summary['mean_FSC_A'] == pytest.approx(gated['FSC-A'].mean())
+    assert len(os.listdir(cache_dir)) == 4
+
+    # Ensure changing the file contents invalidates the entry.
+    pd.read_csv(path).iloc[:4000].to_csv(path, index=False)
+    idx, summary = cached_gate(path, 0.4, cache_dir)
+    assert summary['events'] == len(idx) == 4000
+
+    # Ensure the plate gating goes through the cache.
+    plate = gate_plate([path], 0.4, workers=1, cache_dir=cache_dir)
+    assert plate['gated_events'][0] == summary['gated_events']
+
+
+def test_fit_2D_gaussian_streaming():
+    mean = [1E4, 1E3]
+    cov = [[100, 30], [30, 50]]
+    rnd_df = pd.DataFrame(np.random.multivariate_normal(mean, cov, 200000),
+                          columns=['x', 'y'])
+    exact_mu, exact_cov = fit_2D_gaussian(rnd_df, x_val='x', y_val='y')
+
+    # Ensure the sketch is exact when it holds every event.
+    mu, _cov = fit_2D_gaussian(rnd_df, x_val='x', y_val='y',
+                               chunk_size=30000, sketch_size=200000)
+    assert mu == pytest.approx(exact_mu)
+    assert _cov == pytest.approx(exact_cov)
+
+    # Ensure a bounded sketch stays close and is reproducible.
+    mu, _cov = fit_2D_gaussian(rnd_df, x_val='x', y_val='y', chunk_size=30000,
+                               sketch_size=20000, seed=1)
+    _mu, __cov = fit_2D_gaussian(rnd_df, x_val='x', y_val='y',
+                                 chunk_size=30000, sketch_size=20000, seed=1)
+    assert mu == _mu
+    assert (_cov == __cov).all()
+    assert mu == pytest.approx(exact_mu, abs=0.5)
+    assert _cov == pytest.approx(exact_cov, rel=0.1)
+
+    # Ensure the drift report agrees with the comparison.
+    from mut._fit_bivariate_normal_AstroML import bivariate_fit_drift
+    drift = bivariate_fit_drift(rnd_df['x'], rnd_df['y'], chunk_size=30000,
+                                sketch_size=20000, seed=1)
+    assert drift['mu_x'] == pytest.approx(np.abs(mu[0] - exact_mu[0]))
+    assert 0 < drift['rank_error'] < 0.05
+    assert bivariate_fit_drift(rnd_df['x'][:1000], rnd_df['y'][:1000],
+                               chunk_size=300)['mu_x'] == 0
+
+    # Ensure the gate streams its fit and mismatched chunks are rejected.
+    from mut._fit_bivariate_normal_AstroML import reservoir_sample
+    gated = gaussian_gate(rnd_df, 0.4, x_val='x', y_val='y', log=False,
+                          chunk_size=30000, sketch_size=20000, seed=1)
+    idx = gauss_interval(rnd_df, mu, _cov, log=False, x_val='x', y_val='y')
+    assert gated.index.equals(
+        rnd_df.index[idx <= scipy.stats.chi2.ppf(0.4, 2)])
+    with pytest.raises(ValueError):
+        reservoir_sample([(np.ones(3), np.ones(2))])
+
+
+def test_subsampled_gate():
+    mean = [1E4, 1E4]
+    cov = [[100, 0], [0, 100]]
+    rnd_df = pd.DataFrame(np.random.multivariate_normal(mean, cov, 100000),
+                          columns=['x', 'y'])
+    full = gaussian_gate(rnd_df, 0.4, x_val='x', y_val='y')
+
+    # Ensure subsampled gates are reproducible and cover all events.
+    gated = gaussian_gate(rnd_df, 0.4, x_val='x', y_val='y',
+                          fit_sample_size=10000, seed=42)
+    _gated = gaussian_gate(rnd_df, 0.4, x_val='x', y_val='y',
+                           fit_sample_size=10000, seed=42)
+    assert gated.equals(_gated)
+    assert len(gated) / len(rnd_df) == pytest.approx(0.4, 0.1)
+    assert len(gated) == pytest.approx(len(full), 0.05)
+
+    # Ensure the diagnostic reports the change in the gated fraction.
+    error = gate_sampling_error(rnd_df, 0.4, 10000, x_val='x', y_val='y',
+                                seed=42)
+    assert error['full_fraction'] == len(full) / len(rnd_df)
+    assert error['sample_fraction'] == len(gated) / len(rnd_df)
+    assert error['discordance'] >= np.abs(error['fraction_change'])
+    assert error['discordance'] < 0.05
+    no_error = gate_sampling_error(rnd_df, 0.4, len(rnd_df), x_val='x',
+                                   y_val='y')
+    assert no_error['discordance'] == 0
+
+
+def test_compute_fold_change():
+    # Assemble a synthetic plate summary of two runs.
+    rows = []
+    for date in [20190410, 20190411]:
+        for c in [0, 10, 100]:
+            rows.append(dict(date=date, mutant='auto', operator='O2',
+                             IPTGuM=c, mean_FITC_H=np.random.uniform(1, 2)))
+            for op in ['O1', 'O2']:
+                for m in ['delta', 'Q294K', 'F164T']:
+                    rows.append(dict(date=date, mutant=m, operator=op,
+                                     IPTGuM=c,
+                                     mean_FITC_H=np.random.uniform(2, 10)))
+    summary = pd.DataFrame(rows)
+    summary['file'] = ['well_{}'.format(i) for i in range(len(summary))]
+
+    # Ensure the merge agrees with filtering the references of each sample.
+    fc_df = compute_fold_change(summary)
+    assert len(fc_df) == len(summary)
+    assert np.all(np.isnan(fc_df[fc_df['mutant'] == 'auto']['fold_change']))
+    for _, row in fc_df[fc_df['mutant'] != 'auto'].iterrows():
+        run = summary[(summary['date'] == row['date']) &
+                      (summary['IPTGuM'] == row['IPTGuM'])]
+        auto = run[run['mutant'] == 'auto']['mean_FITC_H'].values[0]
+        delta = run[(run['mutant'] == 'delta') &
+                    (run['operator'] == row['operator'])][
+                        'mean_FITC_H'].values[0]
+        assert row['fold_change'] == pytest.approx(
+            (row['mean_FITC_H'] - auto) / (delta - auto))
+    assert np.allclose(fc_df[fc_df['mutant'] == 'delta']['fold_change'], 1)
+
+    # Ensure incremental updates match computing all samples at once.
+    full = fc_df.sort_values('file').reset_index(drop=True)
+    for _ in range(5):
+        order = np.random.permutation(len(summary))
+        inc_df = None
+        for batch in np.array_split(order, 4):
+            inc_df = compute_fold_change(summary.iloc[batch],
+                                         previous=inc_df)
+        inc_df = inc_df.sort_values('file').reset_index(drop=True)
+        pd.testing.assert_frame_equal(inc_df, full[inc_df.columns],
+                                      check_dtype=False)
+
+    # Ensure regated references update the samples that depend on them.
+    regated = summary[summary['mutant'] == 'auto'].iloc[:1].copy()
+    regated['mean_FITC_H'] = 0
+    update = compute_fold_change(regated, previous=fc_df)
+    with pytest.raises(ValueError):
+        compute_fold_change(regated.drop(columns='file'), previous=fc_df)
+    truth = compute_fold_change(pd.concat([summary[~summary['file'].isin(
+        regated['file'])], regated]))
+    update = update.sort_values('file').reset_index(drop=True)
+    truth = truth.sort_values('file').reset_index(drop=True)
+    pd.testing.assert_frame_equal(update, truth[update.columns],
+                                  check_dtype=False)
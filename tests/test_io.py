@@ -3,7 +3,8 @@ import numpy as np
 import pandas as pd
 import sys
 sys.path.insert(0, '../')
-from mut.io import scrape_frontmatter
+from mut.io import scrape_frontmatter, write_samples, read_samples, \
+    sample_partitions
 
 
 def test_scrape_frontmatter():
@@ -26,3 +27,37 @@ def test_scrape_frontmatter():
     with pytest.raises(UserWarning):
         assert scrape_frontmatter('tests/test_data', file='test_wrongstatus.md')
         assert scrape_frontmatter('tests/test_data', file='test_nostatus.md')
+
+
+def test_sample_store(tmp_path):
+    np.random.seed(42)
+    df = pd.DataFrame({'mutant': np.repeat(['Q294K', 'Y20I', 'WT'], 100),
+                       'operator': np.tile(['O1', 'O2'], 150),
+                       'repressors': 260.0,
+                       'Ka': np.random.lognormal(5, 1, 300),
+                       'chain': np.tile(np.arange(4), 75)})
+    store = str(tmp_path / 'store')
+    write_samples(df, store)
+    assert len(sample_partitions(store)) == 6
+
+    # Ensure the draws are stored as single precision and partitioned.
+    samples = read_samples(store, mutant='Q294K', operator='O2')
+    truth = df[(df['mutant'] == 'Q294K') & (df['operator'] == 'O2')]
+    assert len(samples) == 50
+    assert samples['Ka'].dtype == np.float32
+    assert samples['chain'].dtype == truth['chain'].dtype
+    assert samples['Ka'].values == pytest.approx(truth['Ka'].values, rel=1E-6)
+    assert samples['mutant'].dtype.name == 'category'
+    assert (samples['repressors'] == 260).all()
+
+    # Ensure multiple values, numeric keys, and columns are respected.
+    samples = read_samples(store, columns=['Ka'], mutant=['Q294K', 'WT'],
+                           repressors=260, memory_map=False)
+    assert len(samples) == 200
+    assert list(samples.columns) == ['Ka', 'mutant', 'operator', 'repressors']
+    assert len(read_samples(store, mutant='not a mutant')) == 0
+
+    # Ensure rewriting the store removes the partitions no longer present.
+    write_samples(df[df['mutant'] != 'Y20I'], store)
+    assert len(sample_partitions(store)) == 4
+    assert 'Y20I' not in read_samples(store)['mutant'].values
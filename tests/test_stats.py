@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+sys.path.insert(0, '../')
+import mut.stats
+import mut.thermo
+
+
+def test_compute_statistics():
+    # Per-variable reference implementation.
+    def _statistics(df, varnames, logprob_name):
+        ind = np.argmax(df[logprob_name].values)
+        stats = []
+        for v in varnames:
+            hpd_min, hpd_max = mut.stats.compute_hpd(df[v].values, 0.95)
+            stats.append([v, df[v].mean(), df[v].median(), df.iloc[ind][v],
+                          hpd_min, hpd_max])
+        return pd.DataFrame(stats, columns=['parameter', 'mean', 'median',
+                                            'mode', 'hpd_min', 'hpd_max'])
+
+    np.random.seed(42)
+    for n in [1, 2, 999, 1000]:
+        df = pd.DataFrame({'a': np.random.normal(0, 1, n),
+                           'b': np.random.exponential(2, n),
+                           'c': np.random.randint(0, 5, n),
+                           'lp__': np.random.normal(0, 1, n)})
+        truth = _statistics(df, ['a', 'b', 'c', 'lp__'], 'lp__')
+        test = mut.stats.compute_statistics(df, logprob_name='lp__')
+        assert list(test.columns) == list(truth.columns)
+        assert list(test['parameter']) == list(truth['parameter'])
+        for k in ['mean', 'median', 'mode', 'hpd_min', 'hpd_max']:
+            assert test[k].values == pytest.approx(truth[k].values.astype(float))
+
+    # Ensure varnames are respected and NaNs are skipped by the median.
+    df['a'] = np.nan
+    df.loc[:10, 'b'] = np.nan
+    test = mut.stats.compute_statistics(df, varnames=['b', 'a'],
+                                        logprob_name='lp__')
+    assert list(test['parameter']) == ['b', 'a']
+    assert test['median'][0] == pytest.approx(df['b'].median())
+    assert test['mean'][0] == pytest.approx(df['b'].mean())
+    assert np.isnan(test['median'][1])
+
+
+def test_compute_hpd():
+    np.random.seed(42)
+    samples = np.random.lognormal(0, 1, size=(1000, 50))
+
+    # Ensure the 1D behavior is preserved.
+    hpd = mut.stats.compute_hpd(samples[:, 0], 0.95)
+    assert hpd.shape == (2,)
+    d = np.sort(samples[:, 0])
+    assert np.sum((d >= hpd[0]) & (d <= hpd[1])) == 951
+    widths = d[950:] - d[:50]
+    assert hpd[1] - hpd[0] == np.min(widths)
+
+    # Ensure the batched bounds match the column-wise computation.
+    truth = np.array([mut.stats.compute_hpd(samples[:, i], 0.95)
+                      for i in range(samples.shape[1])]).T
+    assert (mut.stats.compute_hpd(samples, 0.95) == truth).all()
+    assert (mut.stats.compute_hpd(samples.T, 0.95, axis=1) == truth).all()
+    assert mut.stats.compute_hpd(samples.reshape(1000, 5, 10),
+                                 0.95).shape == (2, 5, 10)
+
+
+def test_credible_band():
+    np.random.seed(42)
+    n_draws = 500
+    samples = pd.DataFrame({'Ka': np.random.lognormal(5, 0.1, n_draws),
+                            'Ki': np.random.lognormal(-0.5, 0.1, n_draws),
+                            'ep_AI': np.random.normal(4.5, 0.2, n_draws),
+                            'ep_RA': np.random.normal(-13.9, 0.2, n_draws)})
+    c_range = np.logspace(-2, 4, 20)
+    c_range[0] = 0
+
+    for quantity in ['fold_change', 'bohr_parameter', 'pact']:
+        # Evaluate the band concentration by concentration.
+        truth = np.zeros((2, len(c_range)))
+        truth_median = np.zeros(len(c_range))
+        for i, c in enumerate(c_range):
+            arch = mut.thermo.SimpleRepression(R=260, ep_r=samples['ep_RA'],
+                                               ka=samples['Ka'],
+                                               ki=samples['Ki'],
+                                               ep_ai=samples['ep_AI'],
+                                               effector_conc=c)
+            if quantity == 'pact':
+                val = arch.mwc.pact()
+            else:
+                val = getattr(arch, quantity)()
+            truth[:, i] = mut.stats.compute_hpd(val, 0.95)
+            truth_median[i] = np.median(val)
+
+        for chunk_size in [None, 1, 7]:
+            band, median = mut.stats.credible_band(samples, c_range,
+                                                   quantity=quantity,
+                                                   chunk_size=chunk_size)
+            assert band == pytest.approx(truth)
+            assert median == pytest.approx(truth_median)
+
+    # Ensure fixed and per-draw parameters are broadcast.
+    band, median = mut.stats.credible_band(samples, c_range, ep_r=-13.9,
+                                           R=np.ones(n_draws) * 260)
+    assert band.shape == (2, len(c_range))
+    assert ((band[0] <= median) & (median <= band[1])).all()
+
+    # Ensure pact does not require the repression parameters.
+    band, median = mut.stats.credible_band(
+        samples[['Ka', 'Ki', 'ep_AI']], c_range, quantity='pact')
+    truth, truth_median = mut.stats.credible_band(samples, c_range,
+                                                  quantity='pact')
+    assert (band == truth).all() and (median == truth_median).all()
+
+    with pytest.raises(ValueError):
+        mut.stats.credible_band(samples, c_range, quantity='not a quantity')
+
+    # Ensure concentrations are validated in every chunk.
+    with pytest.raises(RuntimeError):
+        mut.stats.credible_band(samples, np.append(c_range, -1),
+                                chunk_size=10)
+
+
+def test_summary_index():
+    np.random.seed(42)
+    mutants = ['F164T', 'Q294K', 'Q294V', 'Q294R']
+    operators = ['O1', 'O2', 'O3']
+    parameters = ['Ka', 'Ki', 'ep_AI']
+    keys = np.array([(m, o, p) for m in mutants for o in operators
+                     for p in parameters])
+    stats = pd.DataFrame(keys, columns=['mutant', 'operator', 'parameter'])
+    stats['repressors'] = 260.0
+    for s in ['mean', 'median', 'mode', 'hpd_min', 'hpd_max']:
+        stats[s] = np.random.rand(len(stats))
+    stats = stats[['parameter', 'mean', 'median', 'mode', 'hpd_min',
+                   'hpd_max', 'repressors', 'mutant', 'operator']]
+    index = mut.stats.SummaryIndex(stats)
+    assert index.keys == ['mutant', 'operator', 'repressors', 'parameter']
+    assert len(index) == len(stats)
+
+    # Ensure single lookups agree with filtering.
+    for _, row in stats.sample(20, random_state=42).iterrows():
+        value = index.get('hpd_min', mutant=row['mutant'],
+                          operator=row['operator'],
+                          repressors=int(row['repressors']),
+                          parameter=row['parameter'])
+        assert value == row['hpd_min']
+
+    # Ensure bulk lookups broadcast and agree with filtering.
+    values = index.lookup(['median', 'mode'], mutant=mutants, operator='O2',
+                          repressors=260, parameter='Ka')
+    assert values.shape == (len(mutants), 2)
+    for m, v in zip(mutants, values):
+        truth = stats[(stats['mutant'] == m) & (stats['operator'] == 'O2') &
+                      (stats['parameter'] == 'Ka')]
+        assert list(v) == list(truth[['median', 'mode']].values[0])
+
+    with pytest.raises(KeyError):
+        index.get(mutant='Q294K', operator='O2', parameter='Ka')
+    with pytest.raises(KeyError):
+        index.lookup(mutant=['Q294K', 'wt'], operator='O2', repressors=260,
+                     parameter='Ka')
+    with pytest.raises(ValueError):
+        mut.stats.SummaryIndex(stats, keys=['mutant', 'parameter'])
+
+
+def test_empirical_F_limits():
+    F_grid = np.array([-10, -1, 0, 1, 10])
+    sigma_grid = np.array([0.01, 0.2])
+    bias, width = mut.stats.empirical_F_limits(F_grid, sigma_grid, 10,
+                                               n_sims=5, seed=42,
+                                               chunk_size=7)
+    assert bias.shape == width.shape == (len(F_grid), len(sigma_grid))
+
+    # Ensure the free energy is identifiable near F = 0 at low noise.
+    assert np.all(np.abs(bias[1:4, 0]) < 0.2)
+    assert np.all(width[1:4, 0] < 0.5)
+
+    # Ensure the bias is toward zero when the fold-change saturates.
+    assert np.all(bias[0] > 2) and np.all(bias[-1] < -2)
+    assert np.all(width[[0, -1]] > 1)
@@ -1,3 +1,6 @@
+import os
+import subprocess
+import tracemalloc
 import numpy as np
 import pytest
 import sys
@@ -67,3 +70,152 @@ def test_MWC():
     # Ensure that the values for pact are in the range zero to one.
     max_val, min_val = np.max(test_pact), np.min(test_pact)
     assert (max_val <= 1) & (min_val >= 0)
+
+
+def test_log_space():
+    # Ensure the log-space quantities agree with the direct evaluation.
+    c, ka, ki, ep_ai, n = np.meshgrid(np.logspace(-2, 4, 10),
+                                      np.logspace(0, 3, 5),
+                                      np.logspace(-2, 1, 5),
+                                      np.linspace(-5, 5, 5), [1, 2, 4])
+    arch = mut.thermo.SimpleRepression(R=260, ep_r=-13.9, effector_conc=c,
+                                       ka=ka, ki=ki, ep_ai=ep_ai, n_sites=n)
+    assert arch.mwc.log_pact() == pytest.approx(np.log(arch.mwc.pact()),
+                                                rel=1E-12)
+    assert arch.log_fold_change() == pytest.approx(
+        np.log(arch.fold_change()), rel=1E-12)
+    assert arch.bohr_parameter() == pytest.approx(
+        -13.9 - np.log(arch.mwc.pact()) - np.log(260 / 4.6E6), rel=1E-12)
+
+    # Ensure extreme values remain finite where the direct form overflows.
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        mwc = mut.thermo.MWC(effector_conc=np.array([1E200]), ka=1E10,
+                             ki=1E-10, ep_ai=800, n_sites=1000)
+        assert not np.isfinite(np.log(mwc.pact())).any()
+    log_ratio = 1000 * (np.log1p(1E210) - np.log1p(1E190))
+    assert mwc.log_pact() == pytest.approx(800 - log_ratio, rel=1E-12)
+    arch = mut.thermo.SimpleRepression(R=260, ep_r=-13.9, effector_conc=0,
+                                       ka=139, ki=0.53, ep_ai=-800)
+    bohr = -13.9 + 800 - np.log(260 / 4.6E6)
+    assert arch.bohr_parameter() == pytest.approx(bohr, rel=1E-12)
+    assert arch.log_fold_change() == pytest.approx(-np.exp(-bohr), rel=1E-12)
+
+
+def test_kernels():
+    # Ensure the functional kernels agree exactly with the classes.
+    c, ka, ep_ai = np.meshgrid(np.logspace(-2, 4, 20), np.logspace(0, 3, 5),
+                               np.linspace(-5, 5, 5))
+    pars = dict(R=260, ep_r=-13.9, ka=ka, ki=0.53, ep_ai=ep_ai, n_sites=2)
+    arch = mut.thermo.SimpleRepression(effector_conc=c, **pars)
+    args = (260, -13.9, c, ka, 0.53, ep_ai, 2)
+    assert (mut.thermo.pact(*args[2:]) == arch.mwc.pact()).all()
+    assert (mut.thermo.log_pact(*args[2:]) == arch.mwc.log_pact()).all()
+    assert (mut.thermo.fold_change(*args) == arch.fold_change()).all()
+    assert (mut.thermo.log_fold_change(*args) ==
+            arch.log_fold_change()).all()
+    assert (mut.thermo.bohr_parameter(*args) == arch.bohr_parameter()).all()
+
+    # Ensure output and workspace arrays can be provided.
+    out, work = np.empty_like(c), np.empty_like(c)
+    fc = mut.thermo.fold_change(*args, out=out, work=work)
+    assert fc is out
+    assert (fc == arch.fold_change()).all()
+    with pytest.raises(ValueError):
+        mut.thermo.fold_change(*args, out=out, work=np.empty(5))
+
+    # Ensure validation is optional.
+    with pytest.raises(RuntimeError):
+        mut.thermo.fold_change(-1, *args[1:], validate=True)
+    with pytest.raises(RuntimeError):
+        mut.thermo.pact(-1, 1, 1, 1, validate=True)
+    with pytest.raises(ValueError):
+        mut.thermo.pact(1, 0, 1, 1, validate=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mut.thermo.pact(1, np.zeros(1), 1, 1)
+        mut.thermo.MWC(1, np.zeros(1), 1, 1, validate=False).pact()
+        mut.thermo.SimpleRepression(-1, -13.9, effector_conc=1, ka=0, ki=1,
+                                    ep_ai=1, validate=False)
+
+
+def test_induction_properties():
+    # Ensure the fused kernel agrees with the individual methods.
+    np.random.seed(42)
+    draws = {'Ka': np.random.lognormal(5, 1, 1000),
+             'Ki': np.random.lognormal(-1, 1, 1000),
+             'ep_AI': np.random.normal(4, 2, 1000)}
+    props = mut.thermo.induction_properties(draws, R=260, ep_r=-13.9)
+    for i in np.random.choice(1000, 20, replace=False):
+        arch = mut.thermo.SimpleRepression(R=260, ep_r=-13.9,
+                                           effector_conc=0,
+                                           ka=draws['Ka'][i],
+                                           ki=draws['Ki'][i],
+                                           ep_ai=draws['ep_AI'][i])
+        truth = {'leakiness': arch.leakiness(),
+                 'saturation': arch.saturation(),
+                 'dynamic_range': arch.dynamic_range(),
+                 'EC50': arch.ec50(), 'effective_hill': arch.effective_hill()}
+        for k, v in truth.items():
+            assert props[k][i] == pytest.approx(v, rel=1E-9)
+        assert arch.compute_properties() == pytest.approx(
+            {k: v[i] for k, v in props.items()}, rel=1E-12)
+
+    # Ensure values and columns can be mixed.
+    props = mut.thermo.induction_properties(draws, R=60, ep_r=-9.7, ka=139,
+                                            ki='Ki', ep_ai=4.5)
+    arch = mut.thermo.SimpleRepression(R=60, ep_r=-9.7, effector_conc=0,
+                                       ka=139, ki=draws['Ki'][0], ep_ai=4.5)
+    assert props['EC50'].shape == (1000,)
+    assert props['EC50'][0] == pytest.approx(arch.ec50(), rel=1E-9)
+
+
+def test_out_buffers():
+    # Evaluate a 500 x 500 grid of effector concentration and Ka.
+    c, ka = np.meshgrid(np.logspace(-2, 4, 500), np.logspace(0, 3, 500))
+    arch = mut.thermo.SimpleRepression(R=260, ep_r=-13.9, effector_conc=c,
+                                       ka=ka, ki=0.53, ep_ai=4.5)
+    out = np.empty_like(c)
+    assert (arch.mwc.pact(out=out) == arch.mwc.pact()).all()
+    assert (arch.fold_change(out=out) == arch.fold_change()).all()
+    assert (arch.bohr_parameter(out=out) == arch.bohr_parameter()).all()
+    with pytest.raises(ValueError):
+        arch.fold_change(out=np.empty(500))
+
+    # Ensure buffers overlapping the inputs are rejected.
+    for kernel in [mut.thermo.pact, mut.thermo.log_pact]:
+        _c = c[0].copy()
+        with pytest.raises(ValueError):
+            kernel(_c, 139, 0.53, 4.5, out=_c)
+        with pytest.raises(ValueError):
+            kernel(_c, 139, 0.53, 4.5, out=np.empty(500), work=_c)
+    with pytest.raises(ValueError):
+        mut.thermo.fold_change(260, -13.9, _c, 139, 0.53, 4.5, out=_c)
+
+    # Ensure repeated evaluations with buffers allocate no arrays.
+    def benchmark(out=None):
+        tracemalloc.start()
+        for _ in range(10):
+            arch.fold_change(out=out)
+            arch.bohr_parameter(out=out)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    assert benchmark() > 2 * out.nbytes
+    assert benchmark(out) < 0.01 * out.nbytes
+
+
+def test_import_time():
+    # Import the thermodynamic models in a fresh interpreter.
+    code = ("import sys, time; start = time.perf_counter(); import mut.thermo; "
+            "print(time.perf_counter() - start); "
+            "print(' '.join(sys.modules))")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                         stdout=subprocess.PIPE, universal_newlines=True)
+    elapsed, modules = out.stdout.strip().split('\n')
+    modules = set(m.split('.')[0] for m in modules.split())
+
+    # Ensure no plotting, flow, or Stan dependencies are pulled in.
+    for heavy in ['bokeh', 'matplotlib', 'seaborn', 'scipy', 'fcsparser',
+                  'pystan', 'pandas']:
+        assert heavy not in modules
+    assert float(elapsed) < 1.0